@@ -0,0 +1,240 @@
+"""Animated posters: loops that morph a poster across a parameter sweep or a run of seeds.
+
+Frames are produced by a generator pipeline: a job generator yields builder
+arguments, :func:`frames` renders them in worker processes and yields the
+RGBA frames in order, and a writer encodes each frame as it arrives.  Only a
+window of ``workers + 1`` frames (plus the previous frame, for the writers'
+delta boxes) is in memory at any time.  Each worker draws every frame on the
+same pooled figure (or NumPy canvas), so no figure is built per frame.
+
+    python animate.py loop.gif --page week5 --seed 3 --sweep wobble 0.05 0.4
+    python animate.py spheres.png --page week4_spheres --sweep shadow_offset 0 0.05 --frames 36
+    python animate.py seeds/ --style Minimal --seeds 0-23 --fps 4
+
+The output name picks the format: ``.gif`` an animated GIF, ``.png`` or
+``.apng`` an animated PNG, anything else a directory of numbered PNG frames.
+"""
+import argparse
+import inspect
+import math
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+
+import raster
+from figures import FIGURES
+from scene import draw_on
+
+FPS = 12
+DPI = 100  # screen resolution: a 6x8 in poster is 600x800 pixels
+FRAMES = 48
+
+
+# ==================== Jobs ====================
+def sweep_values(start, stop, frames=FRAMES, loop=True):
+    """``frames`` values from ``start`` to ``stop``.
+
+    With ``loop`` the values ease out to ``stop`` and back again, so the last
+    frame leads smoothly into the first.  Integer ends give integer values.
+    """
+    integral = isinstance(start, int) and isinstance(stop, int)
+    for i in range(frames):
+        t = (1 - math.cos(2*math.pi * i/frames)) / 2 if loop else i / max(frames - 1, 1)
+        v = start + (stop - start) * t
+        yield int(round(v)) if integral else round(v, 4)
+
+def sweep_jobs(build, param, values, **fixed):
+    """One ``(build, kwargs)`` job per value of ``param``."""
+    for v in values:
+        yield build, {**fixed, param: v}
+
+def seed_jobs(build, seeds, **fixed):
+    """One ``(build, kwargs)`` job per seed."""
+    for seed in seeds:
+        yield build, {**fixed, "seed": seed}
+
+
+# ==================== Frames ====================
+@lru_cache(maxsize=1)
+def _canvas(width, height):
+    return raster.Canvas(width, height)
+
+def render_frame(job, dpi=DPI, backend="matplotlib"):
+    """Build and draw one job as an (h, w, 4) uint8 frame of the full figure."""
+    build, kwargs = job
+    scene = build(**kwargs)
+    if backend == "numpy":
+        canvas = _canvas(*raster.canvas_size(scene, dpi))
+        canvas.clear()
+        return raster.draw(scene, canvas, dpi).to_uint8()
+    with FIGURES.subplots(scene.figsize) as (fig, ax):
+        fig.set_dpi(dpi)
+        draw_on(ax, scene)
+        fig.canvas.draw()
+        return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+def frames(jobs, dpi=DPI, backend="matplotlib", workers=None):
+    """Render ``jobs`` lazily and yield their frames in order.
+
+    ``workers`` processes render ahead of the consumer by at most one frame
+    each (``1``: render in this process).  A job equal to the one before it
+    (an integer sweep holding still) reuses that frame.
+    """
+    if workers == 1:
+        last = None
+        for job in jobs:
+            if job != last:
+                frame, last = render_frame(job, dpi, backend), job
+            yield frame
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        window = workers + 1
+        pending = deque()
+        last = None
+        for job in jobs:
+            if job != last:
+                future, last = pool.submit(render_frame, job, dpi, backend), job
+            pending.append(future)
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ==================== Writers ====================
+class GIFWriter:
+    """Streams RGBA frames into a looping animated GIF.
+
+    Each frame is quantized to its own 256-color table.  As in
+    :class:`raster.APNGWriter`, frames after the first cover only the box
+    that changed.
+    """
+
+    def __init__(self, f, width, height, fps=FPS, loops=0):
+        self.f, self.width, self.height = f, width, height
+        self.duration = 1000 / fps  # ms; GIF keeps hundredths of a second
+        self.frames = 0
+        self._prev = None
+        # no global color table; NETSCAPE2.0 extension for the loop count
+        f.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0x70, 0, 0))
+        f.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loops) + b"\x00")
+
+    def write(self, rgba):
+        from PIL import GifImagePlugin, Image  # Pillow is a matplotlib dependency
+
+        x, y, w, h = raster.changed_box(self._prev, rgba)
+        self._prev = rgba
+        im = Image.fromarray(np.ascontiguousarray(rgba[y:y+h, x:x+w, :3]))
+        im = im.quantize(256, Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        for part in GifImagePlugin.getdata(im, (x, y), duration=self.duration, disposal=1, include_color_table=True):
+            self.f.write(part)
+        self.frames += 1
+
+    def close(self):
+        if not self.frames:
+            raise ValueError("a GIF needs at least one frame")
+        self.f.write(b";")
+
+class PNGSequence:
+    """Writes frames as ``frame_0000.png``, ``frame_0001.png``, ... into ``directory``."""
+
+    def __init__(self, directory, dpi=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory, self.dpi = directory, dpi
+        self.frames = 0
+
+    def write(self, rgba):
+        with open(os.path.join(self.directory, f"frame_{self.frames:04d}.png"), "wb") as f:
+            f.write(raster.encode_png(rgba, dpi=self.dpi))
+        self.frames += 1
+
+    def close(self):
+        pass
+
+
+def export(jobs, path, fps=FPS, dpi=DPI, backend="matplotlib", workers=None, loops=0):
+    """Render ``jobs`` into ``path`` (format by extension); returns the frame count."""
+    stream = frames(jobs, dpi, backend, workers)
+    first = next(stream, None)
+    if first is None:
+        raise ValueError("no frames to export")
+    height, width = first.shape[:2]
+
+    def drain(writer):
+        writer.write(first)
+        for rgba in stream:
+            writer.write(rgba)
+        writer.close()
+        return writer.frames
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".gif", ".png", ".apng"):
+        return drain(PNGSequence(path, dpi))
+    with open(path, "wb") as f:
+        if ext == ".gif":
+            return drain(GIFWriter(f, width, height, fps, loops))
+        return drain(raster.APNGWriter(f, width, height, fps, loops))
+
+
+def _value(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+def main(argv=None):
+    from batch_render import parse_seeds
+    from posters import BUILDERS, TASK6_PRESETS, task6_scene
+
+    parser = argparse.ArgumentParser(description="Export a poster animation over a parameter sweep or a seed range.")
+    parser.add_argument("output", help="*.gif, *.png / *.apng, or a directory for PNG frames")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--style", choices=list(TASK6_PRESETS), help="Week 3 Task 6 style (default: Pastel)")
+    source.add_argument("--page", choices=list(BUILDERS), help="app page builder")
+    motion = parser.add_mutually_exclusive_group(required=True)
+    motion.add_argument("--sweep", nargs=3, metavar=("PARAM", "START", "STOP"), help="builder argument to sweep, e.g. wobble 0.05 0.4")
+    motion.add_argument("--seeds", help='one frame per seed, e.g. "0-23"')
+    parser.add_argument("--seed", type=int, default=0, help="seed for a sweep")
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE", help="fixed builder arguments, e.g. shape=Flower")
+    parser.add_argument("--frames", type=int, default=FRAMES, help="frames in a sweep")
+    parser.add_argument("--once", action="store_true", help="sweep start to stop only, instead of there and back")
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--dpi", type=int, default=DPI)
+    parser.add_argument("--backend", choices=["matplotlib", "numpy"], default="matplotlib")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    build = BUILDERS[args.page] if args.page else task6_scene
+    fixed = {} if args.page else {"style": args.style or "Pastel"}
+    for item in args.set:
+        name, _, value = item.partition("=")
+        fixed[name] = _value(value)
+    params = inspect.signature(build).parameters
+    names = list(fixed) + ([args.sweep[0]] if args.sweep else [])
+    unknown = [n for n in names if n not in params or n == "seed"]
+    if unknown:
+        parser.error(f"{build.__name__} has no argument {', '.join(unknown)} (choose from {', '.join(p for p in params if p != 'seed')})")
+
+    if args.sweep:
+        param, start, stop = args.sweep
+        jobs = sweep_jobs(build, param, sweep_values(_value(start), _value(stop), args.frames, not args.once),
+                          seed=args.seed, **fixed)
+    else:
+        jobs = seed_jobs(build, parse_seeds(args.seeds), **fixed)
+    t = time.perf_counter()
+    n = export(jobs, args.output, args.fps, args.dpi, args.backend, args.workers)
+    print(f"Saved {n} frames as {args.output} in {time.perf_counter() - t:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,116 +1,130 @@
-
 import streamlit as st
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import random, math, os
-from matplotlib.colors import hsv_to_rgb
-from io import BytesIO
+import random, os
+import raster
+from palettes import (init_palette_file, read_palette, add_color, update_color, delete_color, make_palette,
+                      uploaded_palette, PaletteUploadError)
+from pipeline import staged
+from posters import WEEK3_PRESETS, Week4Canvas, week2_scene, week3_scene, week4_flowers_scene, week4_spheres_scene, week5_scene, final_scene
+from figures import FIGURES, GUARD, Overloaded
+from render_cache import RENDER_CACHE, make_key
+from disk_cache import DISK_CACHE
+from gallery import THUMB_DPI, thumbnails
+from scene import decimate, fig_to_bytes, scene_png
+from svg import scene_svg
+from timings import TIMINGS, stage
 
 st.set_page_config(page_title="Arts & Advanced Big Data – Kim Seyeon", layout="wide")
 st.title("🎨 Arts & Advanced Big Data — Kim Seyeon")
 st.caption("Week 2–5 + Final integrated as a single web app (Streamlit)")
 
 
-# ==================== Common generators ====================
-def blob(center=(0.5, 0.5), r=0.3, points=200, wobble=0.15):
-    angles = np.linspace(0, 2*math.pi, points, endpoint=False)
-    radii  = r * (1 + wobble*(np.random.rand(points)-0.5))
-    x = center[0] + radii * np.cos(angles)
-    y = center[1] + radii * np.sin(angles)
-    return x, y
-
-def flower(center=(0.5,0.5), petals=8, radius=0.2, points=50):
-    curves = []
-    angles = np.linspace(0, 2*np.pi, petals, endpoint=False)
-    for a in angles:
-        t = np.linspace(0,1,points)
-        x = center[0] + t * radius * np.cos(a) + np.random.normal(0, 0.01, size=points)
-        y = center[1] + t * radius * np.sin(a) + np.random.normal(0, 0.01, size=points)
-        curves.append((x, y))
-    return curves
-
-def sphere(center=(0.5,0.5), radius=0.05, points=100):
-    t = np.linspace(0, 2*np.pi, points)
-    x = center[0] + radius * np.cos(t)
-    y = center[1] + radius * np.sin(t)
-    return x, y
-
-
 # ==================== CSV Palette Manager (Week 5) ====================
-PALETTE_FILE = "palette.csv"
-
-def init_palette_file():
-    if not os.path.exists(PALETTE_FILE):
-        df_init = pd.DataFrame([
-            {"name":"sky", "r":0.4, "g":0.7, "b":1.0},
-            {"name":"sun", "r":1.0, "g":0.8, "b":0.2},
-            {"name":"forest", "r":0.2, "g":0.6, "b":0.3},
-            {"name":"cloud", "r":0.9, "g":0.9, "b":0.95},
-            {"name":"ocean", "r":0.1, "g":0.3, "b":0.8},
-        ])
-        df_init.to_csv(PALETTE_FILE, index=False)
-
-def read_palette():
-    init_palette_file()
-    return pd.read_csv(PALETTE_FILE)
-
-def add_color(name, r, g, b):
-    df = read_palette()
-    df = pd.concat([df, pd.DataFrame([{"name":name,"r":r,"g":g,"b":b}])], ignore_index=True)
-    df.to_csv(PALETTE_FILE, index=False)
-
-def update_color(name, r=None, g=None, b=None):
-    df = read_palette()
-    if name in df["name"].values:
-        idx = df.index[df["name"]==name][0]
-        if r is not None: df.at[idx,"r"] = r
-        if g is not None: df.at[idx,"g"] = g
-        if b is not None: df.at[idx,"b"] = b
-        df.to_csv(PALETTE_FILE, index=False)
-
-def delete_color(name):
-    df = read_palette()
-    df = df[df["name"]!=name]
-    df.to_csv(PALETTE_FILE, index=False)
-
-def load_csv_palette():
-    df = read_palette()
-    return [(row.r, row.g, row.b) for row in df.itertuples()]
-
-def make_palette(k=6, mode="pastel", base_h=0.60, csv_override=None):
-    if mode == "csv":
-        if csv_override is not None:
-            return csv_override
-        return load_csv_palette()
-    cols = []
-    for _ in range(k):
-        if mode == "pastel":
-            h = random.random(); s = random.uniform(0.15,0.35); v = random.uniform(0.9,1.0)
-        elif mode == "vivid":
-            h = random.random(); s = random.uniform(0.8,1.0);  v = random.uniform(0.8,1.0)
-        elif mode == "mono":
-            h = base_h;         s = random.uniform(0.2,0.6);   v = random.uniform(0.5,1.0)
-        else: # random
-            h = random.random(); s = random.uniform(0.3,1.0); v = random.uniform(0.5,1.0)
-        cols.append(tuple(hsv_to_rgb([h,s,v])))
-    return cols
-
 def show_palette(palette):
-    fig, ax = plt.subplots(figsize=(6,1.6))
-    for i, c in enumerate(palette):
-        ax.fill_between([i, i+1], 0, 1, color=c)
-        ax.text(i+0.5, -0.08, f"{i+1}", ha="center", va="top")
-    ax.axis("off")
-    st.pyplot(fig)
+    def render():
+        with FIGURES.subplots((6,1.6)) as (fig, ax):
+            for i, c in enumerate(palette):
+                ax.fill_between([i, i+1], 0, 1, color=c)
+                ax.text(i+0.5, -0.08, f"{i+1}", ha="center", va="top")
+            ax.axis("off")
+            return fig_to_bytes(fig, dpi=PREVIEW_DPI).getvalue()
+    key = make_key("palette", 0, palette=palette)
+    with stage("swatch"):
+        st.image(RENDER_CACHE.get_or_render(key, lambda: guarded(render)))
 
 
 # ==================== Utility ====================
-def fig_to_bytes(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", dpi=300)
-    buf.seek(0)
-    return buf
+PREVIEW_DPI = 200  # same resolution st.pyplot uses
+
+EXPORT_DPI = 300
+
+# Instant preview shown while a cache miss renders at full quality.
+COARSE_DPI = 36
+COARSE_STEP = 8  # keep every 8th vertex of each shape
+
+def png_width(data):
+    return int.from_bytes(data[16:20], "big")  # IHDR width
+
+def guarded(render):
+    """Run a cache-miss render under the memory guard; when the process is
+    overloaded the page shows a notice and stops instead."""
+    try:
+        GUARD.check()
+        return render()
+    except Overloaded as e:
+        st.warning(f"The server is busy ({e}). Please try again in a moment.")
+        st.stop()
+
+# Poster renderers, picked per page in the sidebar: matplotlib draws titles and
+# text labels, the NumPy rasterizer skips them but needs no figure at all.
+RENDERERS = {"matplotlib": scene_png, "numpy": raster.scene_png}
+
+def renderer_choice(page, text=False):
+    """The sidebar renderer; pages whose posters have a title or labels (``text``) keep matplotlib."""
+    if text:
+        st.sidebar.selectbox("Renderer", ["matplotlib"], disabled=True,
+                             help="The NumPy renderer draws no titles or labels, and this poster has them.")
+        return "matplotlib"
+    return st.sidebar.selectbox("Renderer", list(RENDERERS), key=f"renderer_{page}")
+
+def seed_input(page, default):
+    # keyed, and defaulted through session state, so the gallery can open a seed
+    st.session_state.setdefault(f"seed_{page}", default)
+    return st.sidebar.number_input("Seed", min_value=0, max_value=99999, step=1, key=f"seed_{page}")
+
+def cached_scene(page, seed, params, build, palette=None, renderer="matplotlib"):
+    """Return (key, {"scene", "preview", "renderer"}, slot) for a poster, running only the stages whose inputs changed.
+
+    ``build`` must seed and construct the Scene itself.  The scene is cached
+    without the renderer in its key, and its geometry per kernel call (see
+    ``pipeline.py``), so a renderer switch skips ``build`` and a palette
+    change reuses the shapes.  On a preview miss the bytes come from the disk
+    cache when any process has rendered them before; otherwise a coarse
+    preview is put into ``slot`` (an ``st.empty``) at once and
+    ``show_poster`` then swaps in the full image.
+    """
+    key = make_key(page, seed, {**params, "renderer": renderer}, palette)
+    slot = st.empty()
+    def styled():
+        with stage("scene"), staged():
+            return build()
+    scene = RENDER_CACHE.get_or_render(("scene",) + make_key(page, seed, params, palette), lambda: guarded(styled))
+    def full():
+        with stage("coarse"):
+            coarse = scene_png(decimate(scene, COARSE_STEP), dpi=COARSE_DPI)
+            slot.image(coarse, width=png_width(coarse) * PREVIEW_DPI // COARSE_DPI,
+                       caption="Quick preview, rendering full quality…")
+        with stage("preview"):
+            return RENDERERS[renderer](scene, dpi=PREVIEW_DPI)
+    def encoded():
+        with stage("disk"):
+            preview = DISK_CACHE.get(key + ("png", PREVIEW_DPI))
+        return preview if preview is not None else DISK_CACHE.put(key + ("png", PREVIEW_DPI), guarded(full))
+    preview = RENDER_CACHE.get_or_render(key + ("png", PREVIEW_DPI), encoded)
+    return key, {"scene": scene, "preview": preview, "renderer": renderer}, slot
+
+def export_png(key, entry):
+    """Print-resolution PNG of a scene, rendered at most once per scene."""
+    render = RENDERERS[entry["renderer"]]
+    def export():
+        with stage("export"):
+            return render(entry["scene"], dpi=EXPORT_DPI)
+    return RENDER_CACHE.get_or_render(key + ("png", EXPORT_DPI),
+                                      lambda: DISK_CACHE.get_or_render(key + ("png", EXPORT_DPI), lambda: guarded(export)))
+
+def show_poster(key, entry, slot, file_name):
+    with stage("transfer"):
+        slot.image(entry["preview"])
+    # Vector export: written straight from the scene in milliseconds, so always offered.
+    svg = RENDER_CACHE.get_or_render(key + ("svg",), lambda: DISK_CACHE.get_or_render(key + ("svg",), lambda: scene_svg(entry["scene"])))
+    st.download_button("Download SVG", data=svg, file_name=os.path.splitext(file_name)[0] + ".svg", mime="image/svg+xml")
+    # The 300-dpi export is the slowest step of a page view, so it is only
+    # rendered once somebody asks for it.
+    if RENDER_CACHE.peek(key + ("png", EXPORT_DPI)) is None and key + ("png", EXPORT_DPI) not in DISK_CACHE \
+            and not st.button(f"Prepare PNG ({EXPORT_DPI} dpi)"):
+        return
+    data = export_png(key, entry)
+    with stage("transfer"):
+        st.download_button("Download PNG", data=data, file_name=file_name, mime="image/png")
 
 
 # ==================== Sidebar Navigation ====================
@@ -120,7 +134,9 @@ page = st.sidebar.radio("Navigate", [
     "Week 4 – Flowers / Spheres",
     "Week 5 – CSV Palette Poster",
     "Final – Integrated Studio",
-])
+    "Gallery – Seed Explorer",
+], key="nav")
+TIMINGS.begin(page)
 
 
 # ==================== WEEK 2 ====================
@@ -128,26 +144,17 @@ if page == "Week 2 – Generative Poster":
     st.header("Week 2 – Generative Poster Project")
     st.write("Random pastel blobs with reproducibility (seed).")
 
-    seed = st.sidebar.number_input("Seed", min_value=0, max_value=99999, value=42, step=1)
+    seed = seed_input("week2", 42)
     n_layers = st.sidebar.slider("Layers", 1, 20, 10)
     wobble_min, wobble_max = st.sidebar.slider("Wobble Range", 0.0, 1.0, (0.1, 0.4), 0.01)
 
-    # generate_palette equivalent
-    random.seed(seed); np.random.seed(seed)
-    palette = [tuple(0.7 + 0.3*np.array([random.random() for _ in range(3)])) for _ in range(n_layers)]
+    renderer = renderer_choice("week2")
 
-    fig, ax = plt.subplots(figsize=(6,8))
-    ax.axis("off")
-    ax.set_facecolor((0.98, 0.97, 0.95))
-    for i in range(n_layers):
-        wobble = random.uniform(wobble_min, wobble_max)
-        radius = 1.2 - i * 0.08
-        x, y = blob(r=radius, wobble=wobble)
-        color = palette[i % len(palette)]
-        ax.fill(x, y, color=color, alpha=0.4 + i*0.05, edgecolor=(0,0,0,0))
+    def build():
+        return week2_scene(seed, n_layers, (wobble_min, wobble_max))
 
-    st.pyplot(fig)
-    st.download_button("Download PNG", data=fig_to_bytes(fig), file_name="week2_poster.png", mime="image/png")
+    params = {"n_layers": n_layers, "wobble": (wobble_min, wobble_max)}
+    show_poster(*cached_scene("week2", seed, params, build, renderer=renderer), "week2_poster.png")
 
 
 # ==================== WEEK 3 ====================
@@ -155,121 +162,87 @@ elif page == "Week 3 – Parameter Practice":
     st.header("Week 3 – Parameter Practice")
     st.write("Replicate Tasks with adjustable layers/wobble/radius.")
 
-    preset = st.sidebar.selectbox("Preset", ["Task 1 (Default)", "Task 2 • ver1", "Task 2 • ver2", "Task 3 • Pastel", "Task 3 • Vivid", "Task 3 • Monochrome Blue"])
-    seed = st.sidebar.number_input("Seed", min_value=0, max_value=99999, value=0, step=1)
-    random.seed(seed); np.random.seed(seed)
-
-    # Defaults
-    n_layers = 8; wobble_lo, wobble_hi = 0.05, 0.25; r_lo, r_hi = 0.15, 0.45
-    palette_style = "random"
-
-    if preset == "Task 2 • ver1":
-        n_layers = 3; wobble_lo, wobble_hi = 0.01, 0.05; r_lo, r_hi = 0.15, 0.35
-    elif preset == "Task 2 • ver2":
-        n_layers = 20; wobble_lo, wobble_hi = 0.2, 0.5; r_lo, r_hi = 0.25, 0.6
-    elif preset == "Task 3 • Pastel":
-        palette_style = "pastel"
-    elif preset == "Task 3 • Vivid":
-        palette_style = "vivid"
-    elif preset == "Task 3 • Monochrome Blue":
-        palette_style = "mono_blue"
-
-    # palette
-    if palette_style == "pastel":
-        base_colors = [(1.0,0.8,0.8),(1.0,0.9,0.7),(0.8,1.0,0.8),(0.7,0.9,1.0),(0.9,0.8,1.0)]
-    elif palette_style == "vivid":
-        base_colors = [(1,0,0),(0,1,0),(0,0,1),(1,1,0),(1,0,1)]
-    elif palette_style == "mono_blue":
-        base_colors = [(0.2,0.4,1.0),(0.3,0.5,1.0),(0.4,0.6,1.0),(0.5,0.7,1.0),(0.6,0.8,1.0)]
-    else:
-        base_colors = [(random.random(),random.random(),random.random()) for _ in range(6)]
-    palette = random.choices(base_colors, k=6)
-
-    fig, ax = plt.subplots(figsize=(7,10))
-    ax.axis("off")
-    ax.set_facecolor((0.98,0.98,0.97))
+    preset = st.sidebar.selectbox("Preset", list(WEEK3_PRESETS))
+    seed = seed_input("week3", 0)
+    renderer = renderer_choice("week3")
 
-    for _ in range(n_layers):
-        cx, cy = random.random(), random.random()
-        rr = random.uniform(r_lo, r_hi)
-        x, y = blob(center=(cx,cy), r=rr, wobble=random.uniform(wobble_lo, wobble_hi))
-        color = random.choice(palette)
-        alpha = random.uniform(0.25, 0.6)
-        ax.fill(x, y, color=color, alpha=alpha, edgecolor=(0,0,0,0))
+    def build():
+        return week3_scene(seed, preset)
 
-    st.pyplot(fig)
-    st.download_button("Download PNG", data=fig_to_bytes(fig), file_name="week3_poster.png", mime="image/png")
+    show_poster(*cached_scene("week3", seed, {"preset": preset}, build, renderer=renderer), "week3_poster.png")
 
 
 # ==================== WEEK 4 ====================
 elif page == "Week 4 – Flowers / Spheres":
     st.header("Week 4 – Flowers / Spheres")
-    mode = st.sidebar.radio("Mode", ["Flowers", "Spheres"])
-    seed = st.sidebar.number_input("Seed", min_value=0, max_value=99999, value=0, step=1)
-    random.seed(seed); np.random.seed(seed)
+    mode = st.sidebar.radio("Mode", ["Flowers", "Spheres", "Add shapes"], key="week4_mode")
+    seed = seed_input("week4", 0)
 
     if mode == "Flowers":
         layers = st.sidebar.slider("Layers", 1, 12, 3)
         wobble = st.sidebar.slider("Wobble", 0.0, 0.1, 0.01, 0.005)
         palette_index = st.sidebar.selectbox("Palette", [0,1,2], index=0)
-        palettes = [
-            ["#FFB3BA", "#FFDFBA", "#FFFFBA", "#BAFFC9", "#BAE1FF"],
-            ["#F7C8E0", "#FFDDCC", "#FFE6EB", "#D6F5F5", "#C9E4FF"],
-            ["#FDE2E4", "#FAD2E1", "#E2ECE9", "#BEE1E6", "#C6DEF1"],
-        ]
-        colors = palettes[palette_index % len(palettes)]
-
         n_flowers = st.sidebar.slider("How many flowers?", 1, 12, 3)
-        centers = [(random.random(), random.random()) for _ in range(n_flowers)]
-
-        fig, ax = plt.subplots(figsize=(6,6))
-        for c in centers:
-            f = flower(center=c, petals=random.randint(5,12), radius=random.uniform(0.1,0.25))
-            for x, y in f:
-                for l in range(layers):
-                    xs = x + np.random.normal(0, wobble, size=len(x))
-                    ys = y + np.random.normal(0, wobble, size=len(y))
-                    ax.plot(xs, ys, color=random.choice(colors), linewidth=3 + (layers-l), alpha=0.6, solid_capstyle='round')
-        ax.set_xlim(0,1); ax.set_ylim(0,1); ax.axis('off')
-        ax.set_title(f"🌸 Spring Abstract | Layers: {layers}, Wobble: {wobble:.3f}, Palette: {palette_index}")
-        st.pyplot(fig)
-        st.download_button("Download PNG", data=fig_to_bytes(fig), file_name="week4_flowers.png", mime="image/png")
-
-    else:  # Spheres
+        renderer = renderer_choice("week4_flowers", text=True)
+
+        def build():
+            return week4_flowers_scene(seed, layers, wobble, palette_index, n_flowers)
+
+        params = {"layers": layers, "wobble": wobble, "palette": palette_index, "n_flowers": n_flowers}
+        show_poster(*cached_scene("week4_flowers", seed, params, build, renderer=renderer), "week4_flowers.png")
+
+    elif mode == "Spheres":
         layers = st.sidebar.slider("Layers", 1, 10, 5)
         shadow_offset = st.sidebar.slider("Shadow Offset", 0.0, 0.08, 0.02, 0.005)
         palette_index = st.sidebar.selectbox("Palette", [0,1], index=0)
-        palettes = [
-            ["#FF4C4C", "#FFD93D", "#6BCB77", "#4D96FF", "#FF6F91"],  # bright pastel
-            ["#FFB3BA", "#FFDFBA", "#FFFFBA", "#BAFFC9", "#BAE1FF"],  # soft pastel
-        ]
-        colors = palettes[palette_index % len(palettes)]
-
         n_spheres = st.sidebar.slider("How many spheres?", 1, 20, 6)
-        fig, ax = plt.subplots(figsize=(6,6))
-        for _ in range(n_spheres):
-            x, y = sphere(center=(random.random(), random.random()), radius=random.uniform(0.03, 0.1))
-            for l in range(layers):
-                xsh = x + shadow_offset*(layers-l)
-                ysh = y - shadow_offset*(layers-l)
-                ax.fill(xsh, ysh, color='gray', alpha=0.2)
-            ax.fill(x, y, color=random.choice(colors), alpha=0.9)
-        ax.set_xlim(0,1); ax.set_ylim(0,1); ax.axis('off')
-        ax.set_title(f"🍓 Fruity 3D Poster | Layers: {layers}, Shadow: {shadow_offset}, Palette: {palette_index}")
-        st.pyplot(fig)
-        st.download_button("Download PNG", data=fig_to_bytes(fig), file_name="week4_spheres.png", mime="image/png")
+        renderer = renderer_choice("week4_spheres", text=True)
+
+        def build():
+            return week4_spheres_scene(seed, layers, shadow_offset, palette_index, n_spheres)
+
+        params = {"layers": layers, "shadow": shadow_offset, "palette": palette_index, "n_spheres": n_spheres}
+        show_poster(*cached_scene("week4_spheres", seed, params, build, renderer=renderer), "week4_spheres.png")
+
+    else:  # Add shapes: one growing poster per session; each click draws only the new shape
+        kind = st.sidebar.radio("Shape", ["flowers", "spheres"], format_func=str.title, key="week4_kind")
+        if kind == "flowers":
+            layers = st.sidebar.slider("Layers", 1, 12, 3)
+            wobble = st.sidebar.slider("Wobble", 0.0, 0.1, 0.01, 0.005)
+            palette_index = st.sidebar.selectbox("Palette", [0,1,2], index=0)
+            style = {"layers": layers, "wobble": wobble, "palette_index": palette_index}
+        else:
+            layers = st.sidebar.slider("Layers", 1, 10, 5)
+            shadow_offset = st.sidebar.slider("Shadow Offset", 0.0, 0.08, 0.02, 0.005)
+            palette_index = st.sidebar.selectbox("Palette", [0,1], index=0)
+            style = {"layers": layers, "shadow_offset": shadow_offset, "palette_index": palette_index}
+        x = st.sidebar.slider("X", 0.0, 1.0, 0.5, 0.01)
+        y = st.sidebar.slider("Y", 0.0, 1.0, 0.5, 0.01)
+
+        state_key = f"week4_canvas_{kind}"
+        add_col, clear_col = st.columns(2)
+        if clear_col.button("Clear") or state_key not in st.session_state:
+            canvas = Week4Canvas(kind, seed)
+            st.session_state[state_key] = (canvas, GUARD.hold(raster.LiveRaster(canvas.scene, dpi=PREVIEW_DPI)))
+        canvas, live = st.session_state[state_key]
+        if add_col.button(f"Add {kind[:-1]}"):
+            canvas.add((x, y), **style)
+        with stage("composite"):
+            png = live.png()
+        st.image(png, caption=f"{canvas.count} {kind} (seed {canvas.seed}); new ones use the current settings")
+        st.download_button("Download PNG", data=png, file_name=f"week4_{kind}_canvas.png", mime="image/png")
 
 
 # ==================== WEEK 5 ====================
 elif page == "Week 5 – CSV Palette Poster":
     st.header("Week 5 – CSV Palette Manager + Poster")
-    seed = st.sidebar.number_input("Seed", min_value=0, max_value=99999, value=0, step=1)
-    random.seed(seed); np.random.seed(seed)
+    seed = seed_input("week5", 0)
 
     mode = st.sidebar.selectbox("Palette Mode", ["pastel","vivid","mono","random","csv"], index=0)
     k = st.sidebar.slider("Palette Size (k)", 3, 12, 6)
     n_layers = st.sidebar.slider("Layers", 3, 20, 8)
     wobble = st.sidebar.slider("Wobble", 0.01, 1.0, 0.15, 0.01)
+    renderer = renderer_choice("week5", text=True)
 
     st.subheader("Palette CSV")
     init_palette_file()
@@ -277,10 +250,9 @@ elif page == "Week 5 – CSV Palette Poster":
     csv_override = None
     if uploaded is not None:
         try:
-            dfu = pd.read_csv(uploaded)
-            csv_override = [(r.r, r.g, r.b) for r in dfu.itertuples()]
+            csv_override = uploaded_palette(uploaded.getvalue()).colors
             st.success("Custom CSV palette loaded from upload.")
-        except Exception as e:
+        except PaletteUploadError as e:
             st.error(f"CSV parse error: {e}")
 
     if st.checkbox("Show / Edit palette.csv on server", value=False):
@@ -303,73 +275,120 @@ elif page == "Week 5 – CSV Palette Poster":
             if st.button("Delete"):
                 delete_color(delname); st.warning(f"Deleted {delname}")
 
-    palette = make_palette(k=k, mode=mode, csv_override=csv_override)
+    palette = make_palette(k=k, mode=mode, csv_override=csv_override, rng=random.Random(seed))
     st.markdown("**Palette Preview**")
     show_palette(palette)
 
-    fig, ax = plt.subplots(figsize=(6,8))
-    ax.axis("off")
-    ax.set_facecolor((0.97,0.97,0.97))
+    def build():
+        return week5_scene(seed, mode, k, n_layers, wobble, csv_override)
 
-    for _ in range(n_layers):
-        cx, cy = random.random(), random.random()
-        rr = random.uniform(0.15, 0.45)
-        x, y = blob((cx,cy), r=rr, wobble=wobble)
-        color = random.choice(palette)
-        alpha = random.uniform(0.3, 0.6)
-        ax.fill(x, y, color=color, alpha=alpha, edgecolor=(0,0,0,0))
-
-    ax.text(0.05, 0.95, f"Interactive Poster • {mode}", transform=ax.transAxes, fontsize=12, weight="bold")
-    st.pyplot(fig)
-    st.download_button("Download PNG", data=fig_to_bytes(fig), file_name="week5_csv_poster.png", mime="image/png")
+    params = {"mode": mode, "k": k, "n_layers": n_layers, "wobble": wobble}
+    show_poster(*cached_scene("week5", seed, params, build, palette=palette, renderer=renderer), "week5_csv_poster.png")
 
 
 # ==================== FINAL ====================
 elif page == "Final – Integrated Studio":
     st.header("Final – Generative Poster Studio (Blob / Flower / Sphere + Palettes + Seed)")
-    seed = st.sidebar.number_input("Seed", min_value=0, max_value=99999, value=42, step=1)
-    random.seed(seed); np.random.seed(seed)
+    seed = seed_input("final", 42)
 
     shape = st.sidebar.selectbox("Shape", ["Blob","Flower","Sphere"], index=0)
     palette_mode = st.sidebar.selectbox("Palette Mode", ["pastel","vivid","mono","csv","random"], index=0)
     n_layers = st.sidebar.slider("Layers", 3, 20, 8)
     wobble = st.sidebar.slider("Wobble (for Blob)", 0.01, 0.5, 0.15, 0.01)
+    renderer = renderer_choice("final", text=True)
 
     uploaded = st.file_uploader("Optional: Upload custom palette.csv for this page", type=["csv"], key="final_csv")
     csv_override = None
     if uploaded is not None:
         try:
-            dfu = pd.read_csv(uploaded)
-            csv_override = [(r.r, r.g, r.b) for r in dfu.itertuples()]
+            csv_override = uploaded_palette(uploaded.getvalue()).colors
             st.success("Custom CSV palette loaded for Final page.")
-        except Exception as e:
+        except PaletteUploadError as e:
             st.error(f"CSV parse error: {e}")
 
-    palette = make_palette(k=6, mode=palette_mode, csv_override=csv_override)
+    palette = make_palette(k=6, mode=palette_mode, csv_override=csv_override, rng=random.Random(seed))
     st.markdown("**Palette Preview**")
     show_palette(palette)
 
-    fig, ax = plt.subplots(figsize=(6,8))
-    ax.axis("off")
-    ax.set_facecolor((0.98,0.98,0.97))
-
-    for _ in range(n_layers):
-        color = random.choice(palette)
-        alpha = random.uniform(0.3,0.6)
-        if shape == "Blob":
-            cx, cy = random.random(), random.random()
-            rr = random.uniform(0.15, 0.45)
-            x, y = blob((cx,cy), r=rr, wobble=wobble)
-            ax.fill(x, y, color=color, alpha=alpha, edgecolor=(0,0,0,0))
-        elif shape == "Flower":
-            curves = flower(center=(random.random(),random.random()), petals=random.randint(5,12), radius=random.uniform(0.1,0.25))
-            for x, y in curves:
-                ax.plot(x, y, color=color, linewidth=3, alpha=alpha)
-        else: # Sphere
-            x, y = sphere(center=(random.random(),random.random()), radius=random.uniform(0.03,0.1))
-            ax.fill(x, y, color=color, alpha=alpha)
-
-    ax.text(0.05,0.95,"Generative Poster Studio", fontsize=14, weight='bold', transform=ax.transAxes)
-    ax.text(0.05,0.91,f"Shape: {shape} • Palette: {palette_mode} • Seed: {seed}", fontsize=10, transform=ax.transAxes)
-    st.pyplot(fig)
-    st.download_button("Download PNG", data=fig_to_bytes(fig), file_name="final_poster.png", mime="image/png")
+    def build():
+        return final_scene(seed, shape, palette_mode, n_layers, wobble, csv_override)
+
+    params = {"shape": shape, "mode": palette_mode, "n_layers": n_layers, "wobble": wobble}
+    show_poster(*cached_scene("final", seed, params, build, palette=palette, renderer=renderer), "final_poster.png")
+
+
+# ==================== GALLERY ====================
+elif page == "Gallery – Seed Explorer":
+    st.header("Gallery – Seed Explorer")
+    st.write("Thumbnails of one page over a range of seeds, with the page's default settings. "
+             "Click a seed to open it.")
+    # gallery id -> (navigation entry, seed box, other widget state to set)
+    targets = {
+        "week2": ("Week 2 – Generative Poster", "week2", {}),
+        "week3": ("Week 3 – Parameter Practice", "week3", {}),
+        "week4_flowers": ("Week 4 – Flowers / Spheres", "week4", {"week4_mode": "Flowers"}),
+        "week4_spheres": ("Week 4 – Flowers / Spheres", "week4", {"week4_mode": "Spheres"}),
+        "week5": ("Week 5 – CSV Palette Poster", "week5", {}),
+        "final": ("Final – Integrated Studio", "final", {}),
+    }
+    target = st.sidebar.selectbox("Page", list(targets), key="gallery_page")
+    count = st.sidebar.select_slider("Thumbnails", [16, 32, 64], value=64)
+    st.session_state.setdefault("gallery_start", 0)
+
+    def turn(step):
+        st.session_state["gallery_start"] = max(0, min(99999, st.session_state["gallery_start"] + step))
+
+    def open_seed(target, seed):
+        nav, seed_page, state = targets[target]
+        st.session_state.update({"nav": nav, f"seed_{seed_page}": seed, **state})
+
+    start = st.sidebar.number_input("First seed", min_value=0, max_value=99999, step=1, key="gallery_start")
+    prev, nxt = st.sidebar.columns(2)
+    prev.button("◀ Previous", on_click=turn, args=(-count,), disabled=start == 0, width="stretch")
+    nxt.button("Next ▶", on_click=turn, args=(count,), width="stretch")
+
+    seeds = list(range(start, min(start + count, 100000)))
+    cols = st.columns(8)
+    cells = {}
+    for i, seed in enumerate(seeds):
+        cells[seed] = cols[i % 8].empty()
+        cells[seed].caption(f"{seed} …")
+    with stage("thumbnails"):
+        for seed, png in thumbnails(target, seeds, THUMB_DPI):
+            cell = cells[seed].container()
+            cell.image(png, width="stretch")
+            cell.button(f"Seed {seed}", key=f"open_{seed}", on_click=open_seed, args=(target, seed),
+                        width="stretch")
+
+
+# ==================== Cache stats ====================
+trace = TIMINGS.end()
+with st.sidebar.expander("Render cache"):
+    stats = RENDER_CACHE.stats()
+    st.write(f"hits {stats['hits']} • misses {stats['misses']} • hit rate {stats['hit_rate']:.0%}")
+    st.write(f"{stats['entries']} entries • {stats['bytes']/2**20:.1f} / {stats['max_bytes']/2**20:.0f} MiB")
+    figs, mem = FIGURES.stats(), GUARD.stats()
+    st.write(f"figures {figs['live']} live • {figs['idle']} idle • {figs['reused']} reused")
+    budget = f" / {mem['budget']/2**20:.0f} MiB" if mem["budget"] else ""
+    st.write(f"RSS {mem['rss']/2**20:.0f} MiB{budget} • evictions {mem['evictions']} • shed {mem['shed']}")
+    st.write(f"live canvases {mem['held']/2**20:.1f} MiB")
+    disk = DISK_CACHE.stats()
+    if disk["directory"]:
+        st.write(f"disk: hits {disk['hits']} • misses {disk['misses']} • {disk['entries']} entries • "
+                 f"{disk['bytes']/2**20:.0f} / {disk['max_bytes']/2**20:.0f} MiB")
+
+with st.sidebar.expander("Timings"):
+    if trace is None:
+        st.write("Timing is switched off (POSTER_TIMINGS=0).")
+    else:
+        import pandas as pd  # only for these tables
+        if st.checkbox("Show this rerun's breakdown", key="show_timings"):
+            own = trace.breakdown()
+            rows = [(path, s * 1000) for path, s in own.items()] + [("other", (trace.total - sum(own.values())) * 1000)]
+            st.dataframe(pd.DataFrame(rows, columns=["stage", "ms"]).round(1), hide_index=True)
+            st.write(f"total {trace.total*1000:.0f} ms")
+        pct = TIMINGS.percentiles(page)
+        st.dataframe(pd.DataFrame([(path, n, *(v * 1000 for v in p)) for path, (n, *p) in pct.items()],
+                                  columns=["stage", "n", "p50 ms", "p90 ms", "p99 ms"]).round(1), hide_index=True)
+        st.download_button("Download JSON trace", TIMINGS.chrome_trace(), file_name="poster_trace.json",
+                           mime="application/json")
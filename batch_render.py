@@ -0,0 +1,142 @@
+"""Headless batch renderer for the Week 3 Task 6 poster styles.
+
+Renders every requested style for a range of seeds across a process pool:
+
+    python batch_render.py --seeds 0-100000 --workers 8 --out posters/
+    python batch_render.py --styles Minimal Vivid --seeds 0-999
+
+Files are written as ``<out>/<style>/<style>_seed<seed>.png``.  Every finished
+file is appended to ``<out>/manifest.jsonl``; a rerun of the same command
+skips everything already listed there (and still on disk), so an interrupted
+print run resumes where it stopped.  With ``--cache`` posters also go through
+the shared disk cache (``disk_cache.py``), so a poster any process rendered
+before is copied instead of drawn again.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+os.environ.setdefault("MPLBACKEND", "Agg")  # workers never open a window; matplotlib loads only if used
+
+from multiprocessing import get_context
+
+from posters import TASK6_PRESETS, task6_scene
+
+log = logging.getLogger("batch_render")
+
+MANIFEST = "manifest.jsonl"
+
+
+# ==================== Jobs ====================
+def parse_seeds(text):
+    """``"0-99"`` (inclusive), ``"7"`` or ``"1,5,10-12"`` -> list of seeds."""
+    seeds = []
+    for part in text.split(","):
+        lo, _, hi = part.strip().partition("-")
+        seeds.extend(range(int(lo), int(hi or lo) + 1))
+    return seeds
+
+def poster_path(out, style, seed):
+    return os.path.join(out, style, f"{style}_seed{seed:06d}.png")
+
+def load_manifest(path):
+    """(style, seed) pairs already rendered; lines cut off by a crash are ignored."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if os.path.exists(rec["file"]):
+                done.add((rec["style"], rec["seed"]))
+    return done
+
+
+# ==================== Worker ====================
+def render_one(job):
+    """Render one poster and write it atomically; runs in a pool worker."""
+    style, seed, path, dpi, backend, cache = job
+    t = time.perf_counter()
+
+    def render():
+        scene = task6_scene(style, seed)
+        if backend == "numpy":
+            import raster
+            return raster.scene_png(scene, dpi=dpi)
+        from scene import scene_png
+        return scene_png(scene, dpi=dpi, bbox_inches=None)  # same framing as generate_poster's savefig
+    if cache:
+        from disk_cache import DISK_CACHE
+        from render_cache import make_key
+        png = DISK_CACHE.get_or_render(make_key("task6", seed, {"style": style, "renderer": backend}) + ("png", dpi), render)
+    else:
+        png = render()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(png)
+    os.replace(tmp, path)
+    return {"style": style, "seed": seed, "file": path, "bytes": len(png),
+            "seconds": round(time.perf_counter() - t, 4)}
+
+
+# ==================== Driver ====================
+def run(styles, seeds, out, workers=None, dpi=300, backend="matplotlib", chunksize=8, log_every=10.0, cache=False):
+    """Render ``styles`` x ``seeds`` into ``out``; returns the number of new files."""
+    os.makedirs(out, exist_ok=True)
+    manifest_path = os.path.join(out, MANIFEST)
+    done = load_manifest(manifest_path)
+    jobs = [(style, seed, poster_path(out, style, seed), dpi, backend, cache)
+            for style in styles for seed in seeds if (style, seed) not in done]
+    total = len(styles) * len(seeds)
+    log.info("%d posters requested, %d already in manifest, %d to render with %s worker(s)",
+             total, total - len(jobs), len(jobs), workers or os.cpu_count())
+    if not jobs:
+        return 0
+
+    start = last = time.perf_counter()
+    rendered = 0
+    # Only the parent writes the manifest, one flushed line per finished file.
+    with open(manifest_path, "a") as manifest, get_context().Pool(workers) as pool:
+        for rec in pool.imap_unordered(render_one, jobs, chunksize=chunksize):
+            manifest.write(json.dumps(rec) + "\n")
+            manifest.flush()
+            rendered += 1
+            now = time.perf_counter()
+            if now - last >= log_every or rendered == len(jobs):
+                rate = rendered / (now - start)
+                log.info("%d/%d rendered • %.1f posters/s • ETA %.0fs",
+                         rendered, len(jobs), rate, (len(jobs) - rendered) / rate)
+                last = now
+    return rendered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render Task 6 posters for a seed range.")
+    parser.add_argument("--styles", nargs="+", default=list(TASK6_PRESETS), metavar="STYLE",
+                        help=f"any of {', '.join(TASK6_PRESETS)} (default: all)")
+    parser.add_argument("--seeds", default="0-99", help='seed range, e.g. "0-100000" or "1,5,10-12"')
+    parser.add_argument("--out", default="posters")
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default: CPU count)")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--backend", choices=["matplotlib", "numpy"], default="matplotlib")
+    parser.add_argument("--chunksize", type=int, default=8, help="jobs handed to a worker at once")
+    parser.add_argument("--log-every", type=float, default=10.0, help="seconds between throughput lines")
+    parser.add_argument("--cache", action="store_true", help="share renders through the disk cache (POSTER_DISK_CACHE)")
+    args = parser.parse_args(argv)
+    unknown = set(args.styles) - set(TASK6_PRESETS)
+    if unknown:
+        parser.error(f"unknown style(s): {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    run(args.styles, parse_seeds(args.seeds), args.out, args.workers, args.dpi,
+        args.backend, args.chunksize, args.log_every, args.cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Side-by-side timing of the matplotlib and NumPy poster renderers.
+
+    python benchmarks/bench_backends.py [--dpi 200] [--repeat 5] [--seed 0] [page ...]
+
+Every page builder in ``posters.BUILDERS`` is rendered to PNG bytes by both
+backends.  Reported per page: median wall time, peak Python-heap allocation
+during one render (tracemalloc; Agg's own C++ pixel buffer is not included,
+so the matplotlib column is a lower bound) and PNG size.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import raster  # noqa: E402
+import scene  # noqa: E402
+from posters import BUILDERS  # noqa: E402
+
+BACKENDS = {"matplotlib": scene.scene_png, "numpy": raster.scene_png}
+
+
+def measure(render, poster, dpi, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        png = render(poster, dpi=dpi)
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    render(poster, dpi=dpi)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak, len(png)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", metavar="page", help=f"any of {', '.join(BUILDERS)} (default: all)")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    unknown = set(args.pages) - set(BUILDERS)
+    if unknown:
+        parser.error(f"unknown page(s): {', '.join(sorted(unknown))}")
+
+    print(f"{'page':15s} {'backend':11s} {'median ms':>10s} {'peak MiB':>9s} {'PNG KiB':>8s} {'speedup':>8s}")
+    for page in args.pages or BUILDERS:
+        poster = BUILDERS[page](args.seed)
+        base = None
+        for name, render in BACKENDS.items():
+            render(poster, dpi=args.dpi)  # warm-up: imports, font cache, trig tables
+            median, peak, size = measure(render, poster, args.dpi, args.repeat)
+            base = base or median
+            print(f"{page:15s} {name:11s} {median*1000:10.1f} {peak/2**20:9.1f} {size/1024:8.0f} {base/median:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
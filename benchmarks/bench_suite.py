@@ -0,0 +1,295 @@
+"""Benchmark suite for every generator and page render stage.
+
+    python benchmarks/bench_suite.py [--only 'page_*'] [--json results.json]
+    python benchmarks/bench_suite.py --save-baseline             # record benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare                   # exit 1 on regressions
+
+Parameter grids follow the sidebar ranges in ``app.py`` (layers 1-20, flowers
+1-12, spheres 1-20, wobble, palette size 3-12).  Stages:
+
+* ``blob`` / ``flower`` / ``sphere``: the batch geometry kernels, for as
+  many shapes as a page draws;
+* ``make_palette`` in every mode, and ``load_csv_palette`` (in-memory store,
+  a cold parse of ``palette.csv``, and a cold map of its binary copy);
+* ``palette_index`` / ``palette_nearest`` / ``palette_near_hue`` /
+  ``palette_sample``: building the Lab index and querying it, for the shipped
+  palette size and a 50,000-color library;
+* ``scene_<page>``: the page's scene builder;
+* ``figure_<page>``: drawing that scene onto a (pooled) figure, without rasterizing;
+* ``fig_to_bytes_<page>``: the PNG the page shows (200 dpi) or exports (300 dpi);
+* ``svg_<page>``: the vector export written straight from the scene;
+* ``week4_add``: adding one flower or sphere to a Week 4 poster that holds
+  ``shapes`` shapes, and compositing it onto the kept 200-dpi canvas (each
+  call starts from a fresh copy of that poster, made outside the timer);
+* ``import``: a fresh interpreter importing the engine or a CLI module, as a
+  pool worker or a cold start does (interpreter start-up included).
+
+Each case is timed with enough calls per sample to last ``--min-time``, and
+reports the median over ``--repeat`` samples, plus the tracemalloc peak of
+one call (Python-heap allocations only; Agg's C++ buffers are not counted).
+A run is compared with a baseline file case by case: a case regresses
+when its time grows by more than ``--time-threshold`` or its peak by more
+than ``--memory-threshold``.  Baselines are machine specific, so record one on the
+machine that runs the comparison.
+"""
+import argparse
+import copy
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import palettes  # noqa: E402
+from figures import FIGURES  # noqa: E402
+from geometry import blob_batch, flower_batch, sphere_batch  # noqa: E402
+from palette_index import PaletteIndex  # noqa: E402
+from raster import LiveRaster  # noqa: E402
+from posters import (final_scene, week2_scene, week3_scene, WEEK3_PRESETS, Week4Canvas,  # noqa: E402
+                     week4_flowers_scene, week4_spheres_scene, week5_scene)
+from scene import draw_on, fig_to_bytes  # noqa: E402
+from svg import scene_svg  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+PALETTE_MODES = ["pastel", "vivid", "mono", "random", "csv"]
+PAGE_DPIS = (200, 300)  # PREVIEW_DPI, EXPORT_DPI in app.py
+IMPORT_MODULES = ["engine", "posters", "raster", "tiles", "animate", "batch_render"]
+
+
+# ==================== Cases ====================
+def _centers(rand, n):
+    return [(rand.random(), rand.random()) for _ in range(n)]
+
+def geometry_cases():
+    rand, nprand = random.Random(0), np.random.RandomState(0)
+    for layers in (1, 10, 20):
+        for wobble in (0.01, 0.15, 1.0):
+            centers, radii = _centers(rand, layers), [0.3] * layers
+            yield "blob", {"layers": layers, "wobble": wobble}, \
+                lambda c=centers, r=radii, w=[wobble]*layers: blob_batch(c, r, w, rng=nprand)
+    for flowers in (1, 6, 12):
+        for layers in (0, 3, 12):
+            centers = _centers(rand, flowers)
+            yield "flower", {"flowers": flowers, "layers": layers}, \
+                lambda c=centers, n=flowers, l=layers: flower_batch(c, [8]*n, [0.2]*n, layers=l, wobble=0.05, rng=nprand)
+    for spheres in (1, 10, 20):
+        centers = _centers(rand, spheres)
+        yield "sphere", {"spheres": spheres}, lambda c=centers, n=spheres: sphere_batch(c, [0.05]*n)
+
+def palette_cases():
+    rand = random.Random(0)
+    for mode in PALETTE_MODES:
+        for k in (3, 6, 12) if mode != "csv" else (6,):
+            yield "make_palette", {"mode": mode, "k": k}, lambda m=mode, k=k: palettes.make_palette(k, m, rng=rand)
+    yield "load_csv_palette", {"store": "cached"}, palettes.load_csv_palette
+    yield "load_csv_palette", {"store": "cold"}, lambda: palettes.PaletteStore(palettes.PALETTE_FILE).palette()
+    yield "load_csv_palette", {"store": "binary"}, lambda: palettes.PaletteStore(palettes.PALETTE_FILE).shared_colors()
+    for n in (20, 50_000):  # the shipped palette and a brand library
+        colors = np.random.default_rng(0).random((n, 3))
+        yield "palette_index", {"n": n}, lambda c=colors: PaletteIndex(c)
+        index = PaletteIndex(colors)
+        yield "palette_nearest", {"n": n, "k": 5}, lambda i=index: i.nearest((0.9, 0.2, 0.3), k=5)
+        yield "palette_near_hue", {"n": n}, lambda i=index: i.near_hue(200, 15)
+        yield "palette_sample", {"n": n, "k": 6}, lambda i=index: i.sample(6, rand)
+
+# page -> (builder, grid of builder arguments)
+PAGES = {
+    "week2": (week2_scene, [{"n_layers": n} for n in (1, 6, 12, 20)]),
+    "week3": (week3_scene, [{"preset": p} for p in WEEK3_PRESETS]),
+    "week4_flowers": (week4_flowers_scene, [{"n_flowers": n, "layers": l} for n in (1, 6, 12) for l in (1, 3, 12)]),
+    "week4_spheres": (week4_spheres_scene, [{"n_spheres": n, "layers": l} for n in (1, 6, 20) for l in (1, 5, 10)]),
+    "week5": (week5_scene, [{"mode": m, "k": 6, "n_layers": 8} for m in PALETTE_MODES]
+                           + [{"mode": "pastel", "k": k, "n_layers": n} for k, n in ((3, 3), (12, 20))]),
+    "final": (final_scene, [{"shape": s, "n_layers": n} for s in ("Blob", "Flower", "Sphere") for n in (3, 8, 20)]),
+}
+
+def page_cases():
+    for page, (build, grid) in PAGES.items():
+        for params in grid:
+            yield f"scene_{page}", params, lambda b=build, p=params: b(0, **p)
+            poster = build(0, **params)
+
+            def figure(poster=poster):
+                with FIGURES.subplots(poster.figsize) as (fig, ax):
+                    draw_on(ax, poster)
+            yield f"figure_{page}", params, figure
+
+            fig = Figure(figsize=poster.figsize)
+            FigureCanvasAgg(fig)
+            draw_on(fig.add_subplot(), poster)
+            for dpi in PAGE_DPIS:
+                yield f"fig_to_bytes_{page}", {**params, "dpi": dpi}, lambda f=fig, d=dpi: fig_to_bytes(f, d)
+            yield f"svg_{page}", params, lambda p=poster: scene_svg(p)
+
+def add_cases():
+    for kind in ("flowers", "spheres"):
+        for shapes in (0, 100):
+            built = []
+
+            def setup(kind=kind, shapes=shapes, built=built):
+                if not built:  # drawn once, on the warm-up call
+                    rand = random.Random(0)
+                    canvas = Week4Canvas(kind, 0)
+                    for _ in range(shapes):
+                        canvas.add(_centers(rand, 1)[0])
+                    live = LiveRaster(canvas.scene, dpi=PAGE_DPIS[0])
+                    live.png()
+                    built.append((canvas, live))
+                return copy.deepcopy(built[0])  # every timed add starts from exactly `shapes` shapes
+
+            def add(state):
+                canvas, live = state
+                canvas.add((0.5, 0.5))
+                return live.png()
+            add.setup = setup
+            yield "week4_add", {"kind": kind, "shapes": shapes}, add
+
+def import_cases():
+    yield "import", {"module": "none"}, lambda: subprocess.run([sys.executable, "-c", "pass"], check=True)
+    for module in IMPORT_MODULES:
+        yield "import", {"module": module}, \
+            lambda m=module: subprocess.run([sys.executable, "-c", f"import {m}"], cwd=ROOT, check=True)
+
+def cases():
+    yield from import_cases()
+    yield from geometry_cases()
+    yield from palette_cases()
+    yield from page_cases()
+    yield from add_cases()
+
+def case_name(stage, params):
+    return f"{stage}[{', '.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+# ==================== Measuring ====================
+def _calls(fn, number):
+    """Seconds spent in ``number`` calls of ``fn``.
+
+    A case with a ``setup`` attribute is called as ``fn(setup())``, and only
+    the call itself is timed.
+    """
+    setup = getattr(fn, "setup", None)
+    if setup is None:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - t
+    elapsed = 0.0
+    for _ in range(number):
+        state = setup()
+        t = time.perf_counter()
+        fn(state)
+        elapsed += time.perf_counter() - t
+    return elapsed
+
+def measure(fn, repeat, min_time):
+    """(median seconds per call, calls per sample, tracemalloc peak bytes of one call)."""
+    _calls(fn, 1)  # warm-up: imports, font and trig caches
+    number = 1
+    while True:
+        elapsed = _calls(fn, number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        samples.append(_calls(fn, number) / number)
+    setup = getattr(fn, "setup", None)
+    state = setup() if setup is not None else None
+    tracemalloc.start()
+    fn(state) if setup is not None else fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples), number, peak
+
+def run(pattern="*", repeat=5, min_time=0.05, log=print):
+    results = {}
+    for stage, params, fn in cases():
+        name = case_name(stage, params)
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        seconds, number, peak = measure(fn, repeat, min_time)
+        results[name] = {"ms": round(seconds * 1000, 4), "calls": number, "peak_kib": round(peak / 1024, 1)}
+        log(f"{name:62s} {seconds*1000:10.3f} ms {peak/1024:10.1f} KiB")
+    return results
+
+def environment():
+    import matplotlib as mpl
+    return {"python": platform.python_version(), "numpy": np.__version__, "matplotlib": mpl.__version__,
+            "machine": platform.machine(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+# ==================== Baseline ====================
+def compare(results, baseline, time_threshold=1.25, memory_threshold=1.25, noise_ms=0.05):
+    """Rows of (name, baseline ms, ms, ratio, problem) for cases in both runs.
+
+    ``problem`` is ``""``, ``"time"``, ``"memory"`` or ``"time+memory"``.
+    Time changes under ``noise_ms`` are never flagged.
+    """
+    rows = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = new["ms"] / old["ms"] if old["ms"] else float("inf")
+        problems = []
+        if ratio > time_threshold and new["ms"] - old["ms"] > noise_ms:
+            problems.append("time")
+        if new["peak_kib"] > old["peak_kib"] * memory_threshold and new["peak_kib"] - old["peak_kib"] > 4:
+            problems.append("memory")
+        rows.append((name, old["ms"], new["ms"], ratio, "+".join(problems)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default="*", metavar="PATTERN", help="glob over case names, e.g. 'fig_to_bytes_*'")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per sample")
+    parser.add_argument("--json", metavar="PATH", help="write the results here")
+    parser.add_argument("--baseline", default=BASELINE, help=f"baseline file (default: {os.path.relpath(BASELINE)})")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare with the baseline; exit 1 on regressions")
+    parser.add_argument("--time-threshold", type=float, default=1.25, help="allowed time ratio over the baseline")
+    parser.add_argument("--memory-threshold", type=float, default=1.25, help="allowed peak-memory ratio over the baseline")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # palette.csv is looked up relative to the app
+    report = {"environment": environment(), "settings": {"repeat": args.repeat, "min_time": args.min_time},
+              "results": run(args.only, args.repeat, args.min_time)}
+    for path in filter(None, [args.json, args.baseline if args.save_baseline else None]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Saved {len(report['results'])} results to {path}")
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report["results"], baseline["results"], args.time_threshold, args.memory_threshold)
+        regressions = [r for r in rows if r[4]]
+        print(f"\nCompared {len(rows)} cases with {args.baseline} ({baseline['environment']['time']}):")
+        for name, old, new, ratio, problem in sorted(rows, key=lambda r: -r[3]):
+            if problem or ratio < 1 / args.time_threshold:
+                print(f"{'REGRESSION' if problem else 'faster':10s} {name:62s} {old:10.3f} -> {new:10.3f} ms ({ratio:.2f}x) {problem}")
+        print(f"{len(regressions)} regression(s)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
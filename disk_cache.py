@@ -0,0 +1,199 @@
+"""Content-addressed poster cache on disk, shared by every process on the machine.
+
+:data:`RENDER_CACHE` lives and dies with one process.  This cache sits behind
+it: rendered PNG and SVG bytes are stored as files named by the SHA-256 of
+their full render spec (the in-memory cache key plus :func:`engine_version`),
+with an SQLite index of sizes and last-access times.  Any number of
+Streamlit servers and batch workers can use the same directory: SQLite (in
+WAL mode) serializes index updates, files are written to a temporary name
+and renamed into place, and an entry whose file has gone missing is dropped
+and treated as a miss.  When the total size passes ``max_bytes`` the least
+recently used entries are removed.
+
+``POSTER_DISK_CACHE`` picks the directory (empty: no disk cache) and
+``POSTER_DISK_CACHE_MAX_BYTES`` its size.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from importlib import metadata
+
+DISK_CACHE_DIR = os.environ.get("POSTER_DISK_CACHE", ".poster_cache")
+DISK_CACHE_MAX_BYTES = int(os.environ.get("POSTER_DISK_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+TOUCH_INTERVAL = 60.0  # seconds; a hit only rewrites its access time when it is older than this
+LOW_WATER = 0.9  # eviction frees space down to this fraction of max_bytes
+BUSY_TIMEOUT_MS = 10_000
+
+# Modules whose code decides what a poster looks like.
+ENGINE_MODULES = ["geometry.py", "palettes.py", "posters.py", "scene.py", "raster.py", "svg.py"]
+
+
+@lru_cache(maxsize=1)
+def engine_version():
+    """Digest of the rendering code and library versions; part of every disk key.
+
+    Editing a builder or renderer, or upgrading matplotlib, starts a fresh
+    set of keys instead of serving posters drawn by the old code.
+    """
+    h = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_MODULES:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(f.read())
+    for lib in ("numpy", "matplotlib"):
+        try:
+            h.update(f"{lib}={metadata.version(lib)}".encode())
+        except metadata.PackageNotFoundError:
+            pass
+    return h.hexdigest()[:16]
+
+def spec_digest(key):
+    """SHA-256 of a render key (as built by ``make_key`` plus output kind)."""
+    return hashlib.sha256(repr((engine_version(), key)).encode()).hexdigest()
+
+
+class DiskCache:
+    """Size-bounded LRU store of rendered bytes under ``directory``.
+
+    With ``directory=None`` every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, directory=DISK_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES):
+        self.directory = directory or None
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+
+    # ---- index ----
+    def _db(self):
+        # one connection per thread and process (never carried across fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.join(self.directory, "objects"), exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"),
+                               timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS entries (digest TEXT PRIMARY KEY, spec TEXT, "
+                     "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest[2:])
+
+    # ---- lookups ----
+    def get(self, key):
+        """Cached bytes for ``key``, or None."""
+        if self.directory is None:
+            return None
+        digest = spec_digest(key)
+        db = self._db()
+        row = db.execute("SELECT size, accessed FROM entries WHERE digest = ?", (digest,)).fetchone()
+        data = None
+        if row is not None:
+            try:
+                with open(self._path(digest), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                pass
+            if data is None or len(data) != row[0]:  # evicted under us, or never completed
+                db.execute("DELETE FROM entries WHERE digest = ?", (digest,))
+                data = None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        now = time.time()
+        if now - row[1] > TOUCH_INTERVAL:
+            db.execute("UPDATE entries SET accessed = ? WHERE digest = ?", (now, digest))
+        return data
+
+    def __contains__(self, key):
+        """Whether ``key`` is indexed, without reading it or counting a lookup."""
+        if self.directory is None:
+            return False
+        return self._db().execute("SELECT 1 FROM entries WHERE digest = ?", (spec_digest(key),)).fetchone() is not None
+
+    def put(self, key, data):
+        """Store ``data`` (bytes) for ``key``; returns ``data``."""
+        if self.directory is None or len(data) > self.max_bytes:
+            return data
+        digest = spec_digest(key)
+        path = self._path(digest)
+        db = self._db()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        now = time.time()
+        db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (digest, repr(key)[:500], len(data), now, now))
+        self._evict()
+        return data
+
+    def get_or_render(self, key, render):
+        """Bytes for ``key`` from disk, or ``render()`` them and store the result."""
+        data = self.get(key)
+        if data is None:
+            data = self.put(key, render())
+        return data
+
+    # ---- eviction ----
+    def _evict(self):
+        db = self._db()
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        db.execute("BEGIN IMMEDIATE")  # one evicting process at a time
+        try:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            target = self.max_bytes * LOW_WATER
+            for digest, size in db.execute("SELECT digest, size FROM entries ORDER BY accessed"):
+                if total <= target:
+                    break
+                victims.append(digest)
+                total -= size
+            db.executemany("DELETE FROM entries WHERE digest = ?", [(d,) for d in victims])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        for digest in victims:
+            try:
+                os.unlink(self._path(digest))
+            except FileNotFoundError:
+                pass
+        self.evictions += len(victims)
+
+    def clear(self):
+        if self.directory is None:
+            return
+        db = self._db()
+        digests = [d for (d,) in db.execute("SELECT digest FROM entries")]
+        db.execute("DELETE FROM entries")
+        for digest in digests:
+            try:
+                os.unlink(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        entries, total = (0, 0) if self.directory is None else \
+            self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {"directory": self.directory, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "entries": entries,
+                "bytes": total, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+DISK_CACHE = DiskCache()
@@ -0,0 +1,47 @@
+"""The poster engine in one import, for workers, scripts and notebooks.
+
+    import engine
+    scene = engine.final_scene(42, shape="Flower")
+    png = engine.render_png(scene, dpi=300)                     # matplotlib
+    png = engine.render_png(scene, dpi=300, backend="numpy")    # no figure at all
+    svg = engine.scene_svg(scene)                               # vector, no figure either
+
+Importing it has no side effects and loads only NumPy: scenes, geometry and
+generated palettes need nothing else.  matplotlib is imported the first time
+a scene is drawn with it, pandas the first time ``palette.csv`` is read.
+Streamlit is never imported.  The notebook exports
+(``arts_and_advanced_big_data_kim_*.py``) stay as they were written: they
+run their demos on import and are not part of the engine.
+"""
+from geometry import blob, blob_batch, flower, flower_batch, sphere, sphere_batch
+from palette_index import PaletteIndex, srgb_to_lab
+from palettes import PALETTE_STORE, PaletteStore, load_csv_palette, make_palette, read_palette
+from pipeline import staged
+from posters import (BUILDERS, TASK6_PRESETS, WEEK3_PRESETS, Week4Canvas, final_scene, seeded, task6_scene,
+                     week2_scene, week3_scene, week4_flowers_scene, week4_spheres_scene, week5_scene)
+from scene import Fill, Scene, Stroke, Text, decimate
+from svg import iter_svg, scene_svg, write_svg
+
+BACKENDS = ("matplotlib", "numpy")
+
+__all__ = ["blob", "blob_batch", "flower", "flower_batch", "sphere", "sphere_batch",
+           "PaletteIndex", "srgb_to_lab", "PALETTE_STORE", "PaletteStore", "load_csv_palette", "make_palette", "read_palette", "staged",
+           "BUILDERS", "TASK6_PRESETS", "WEEK3_PRESETS", "Week4Canvas", "final_scene", "seeded", "task6_scene",
+           "week2_scene", "week3_scene", "week4_flowers_scene", "week4_spheres_scene", "week5_scene",
+           "Fill", "Scene", "Stroke", "Text", "decimate", "iter_svg", "scene_svg", "write_svg", "BACKENDS", "render_png", "render_rgba"]
+
+
+def render_png(scene, dpi=300, backend="matplotlib", **kwargs):
+    """PNG bytes of ``scene``; extra arguments go to the backend's ``scene_png``."""
+    if backend == "numpy":
+        import raster
+        return raster.scene_png(scene, dpi=dpi, **kwargs)
+    if backend != "matplotlib":
+        raise ValueError(f"unknown backend {backend!r}; expected one of {BACKENDS}")
+    from scene import scene_png
+    return scene_png(scene, dpi=dpi, **kwargs)
+
+def render_rgba(scene, dpi=100):
+    """``scene`` drawn by the NumPy backend as an (h, w, 4) uint8 array."""
+    import raster
+    return raster.render_rgba(scene, dpi)
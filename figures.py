@@ -0,0 +1,155 @@
+"""Figure lifecycle and memory guard for the render path.
+
+Figures made with ``plt.subplots`` are registered with pyplot's global figure
+manager and stay alive until somebody calls ``plt.close``.  The render path
+instead checks figures out of :data:`FIGURES`: they are plain Agg figures
+that pyplot never sees, at most ``POSTER_MAX_FIGURES`` are live at once per
+process, and they are cleared and kept for reuse when the ``with`` block
+ends.  :data:`GUARD` watches resident memory against ``POSTER_MEMORY_BUDGET``
+and frees caches, then refuses new renders, when it is exceeded.
+"""
+import gc
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+
+from render_cache import RENDER_CACHE
+
+MAX_LIVE_FIGURES = int(os.environ.get("POSTER_MAX_FIGURES", 4))
+MEMORY_BUDGET = int(os.environ.get("POSTER_MEMORY_BUDGET", 0))  # bytes of RSS; 0 turns the guard off
+CHECKOUT_TIMEOUT = 30.0  # seconds to wait for a free figure before giving up
+
+
+class Overloaded(RuntimeError):
+    """Raised instead of rendering when the process is out of figures or memory."""
+
+
+def rss_bytes():
+    """Current resident set size of this process (0 if it cannot be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+# ==================== Figures ====================
+class FigureManager:
+    """Hands out Agg figures, at most ``max_live`` at a time, and recycles them."""
+
+    def __init__(self, max_live=MAX_LIVE_FIGURES, max_idle=MAX_LIVE_FIGURES):
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._slots = threading.BoundedSemaphore(max_live)
+        self._idle = {}  # figsize -> [Figure]
+        self._live = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subplots(self, figsize):
+        """``with FIGURES.subplots((6, 8)) as (fig, ax):`` — a one-axes figure for this block."""
+        if not self._slots.acquire(timeout=CHECKOUT_TIMEOUT):
+            raise Overloaded("all figures are busy")
+        try:
+            fig = self._checkout(tuple(figsize))
+            try:
+                yield fig, fig.add_subplot()
+            finally:
+                self._checkin(tuple(figsize), fig)
+        finally:
+            self._slots.release()
+
+    def _checkout(self, figsize):
+        with self._lock:
+            self._live += 1
+            idle = self._idle.get(figsize)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+            self.created += 1
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def _checkin(self, figsize, fig):
+        fig.clear()
+        with self._lock:
+            self._live -= 1
+            if sum(len(v) for v in self._idle.values()) < self.max_idle:
+                self._idle.setdefault(figsize, []).append(fig)
+
+    def drop_idle(self):
+        with self._lock:
+            self._idle.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"live": self._live, "idle": sum(len(v) for v in self._idle.values()),
+                    "created": self.created, "reused": self.reused}
+
+
+FIGURES = FigureManager()
+
+
+# ==================== Memory guard ====================
+class MemoryGuard:
+    """Keeps the process under ``budget`` bytes of RSS.
+
+    :meth:`check` runs before every render.  Over budget it first drops idle
+    figures and releases the buffers registered with :meth:`hold`, then the
+    older half of the render cache, then the whole cache; if the process is
+    still too big the render is refused with :class:`Overloaded`.
+    """
+
+    def __init__(self, budget=MEMORY_BUDGET, cache=RENDER_CACHE, figures=FIGURES):
+        self.budget = budget
+        self.cache = cache
+        self.figures = figures
+        self.evictions = 0
+        self.shed = 0
+        self._held = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def hold(self, obj):
+        """Count ``obj.nbytes`` in :meth:`stats` and call ``obj.release()`` when over budget."""
+        with self._lock:
+            self._held.add(obj)
+        return obj
+
+    def _holders(self):
+        with self._lock:
+            return list(self._held)
+
+    def over(self):
+        return bool(self.budget) and rss_bytes() > self.budget
+
+    def check(self):
+        if not self.over():
+            return
+        self.figures.drop_idle()
+        for obj in self._holders():
+            obj.release()
+        for keep in (self.cache.stats()["bytes"] // 2, 0):
+            self.cache.evict_to(keep)
+            self.evictions += 1
+            gc.collect()
+            if not self.over():
+                return
+        self.shed += 1
+        raise Overloaded(f"memory budget of {self.budget/2**20:.0f} MiB reached")
+
+    def stats(self):
+        return {"rss": rss_bytes(), "budget": self.budget, "evictions": self.evictions, "shed": self.shed,
+                "held": sum(obj.nbytes for obj in self._holders())}
+
+
+GUARD = MemoryGuard()
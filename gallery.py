@@ -0,0 +1,77 @@
+"""Seed gallery: low-resolution thumbnails of one page over a range of seeds.
+
+Thumbnails are drawn by the NumPy rasterizer with the builder's default
+arguments, in a pool of worker processes that lives as long as the server
+process (Streamlit reruns ``app.py`` but imports this module once).  Each
+finished thumbnail goes into :data:`RENDER_CACHE` and :data:`DISK_CACHE` as
+soon as its worker returns, even when the rerun that asked for it has been
+interrupted, so paging back and forth through seeds is served from cache.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_all_start_methods, get_context
+
+from disk_cache import DISK_CACHE
+from posters import BUILDERS
+from render_cache import RENDER_CACHE, make_key
+
+THUMB_DPI = 24  # a 6x8 in poster becomes 144x192 pixels
+WORKERS = int(os.environ.get("POSTER_GALLERY_WORKERS", os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def thumb_key(page, seed, dpi=THUMB_DPI):
+    return make_key(page, seed, {"renderer": "numpy"}) + ("thumb", dpi)
+
+def render_thumb(page, seed, dpi=THUMB_DPI):
+    """PNG thumbnail of ``page`` at ``seed``; runs in a pool worker."""
+    import raster
+    return raster.scene_png(BUILDERS[page](seed), dpi=dpi)
+
+def pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # a fresh interpreter per worker: never fork the server's threads
+            method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(WORKERS, mp_context=get_context(method))
+        return _pool
+
+
+def thumbnails(page, seeds, dpi=THUMB_DPI):
+    """Yield ``(seed, png)`` for ``seeds``: cached ones at once, the rest as workers finish them.
+
+    Closing the generator early (a rerun interrupts the page) cancels the
+    renders that have not started.
+    """
+    missing = []
+    for seed in seeds:
+        key = thumb_key(page, seed, dpi)
+        data = RENDER_CACHE.get(key)
+        if data is None:
+            data = DISK_CACHE.get(key)
+            if data is not None:
+                RENDER_CACHE.put(key, data)
+        if data is None:
+            missing.append(seed)
+        else:
+            yield seed, data
+
+    def store(future, key):
+        if not future.cancelled() and future.exception() is None:
+            RENDER_CACHE.put(key, DISK_CACHE.put(key, future.result()))
+
+    futures = {}
+    for seed in missing:
+        future = pool().submit(render_thumb, page, seed, dpi)
+        future.add_done_callback(lambda f, key=thumb_key(page, seed, dpi): store(f, key))
+        futures[future] = seed
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,121 @@
+"""Shape generators for the posters.
+
+``blob``, ``flower`` and ``sphere`` build one shape, as the weekly notebooks
+did.  The ``*_batch`` variants build every shape of a poster at once as
+``(n_shapes, n_points)`` arrays: the trig tables are cached per point count
+and all noise is taken in a single draw, in the same order the one-at-a-time
+loops consumed it, so a seed still gives exactly the same poster.
+
+Noise comes from the ``rng`` argument (a ``np.random.RandomState``), never
+from the global ``np.random`` state; without one a fresh unseeded generator
+is used.  Inside ``pipeline.staged()`` the batch kernels are memoized on
+their arguments and generator state.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from pipeline import memoized
+from timings import timed
+
+
+@lru_cache(maxsize=64)
+def trig_table(points, endpoint=False):
+    """cos/sin of ``points`` angles around the circle (read-only, shared)."""
+    angles = np.linspace(0, 2*math.pi, points, endpoint=endpoint)
+    cos, sin = np.cos(angles), np.sin(angles)
+    cos.flags.writeable = False
+    sin.flags.writeable = False
+    return cos, sin
+
+
+@lru_cache(maxsize=64)
+def ramp(points):
+    """0..1 parameter along a petal."""
+    t = np.linspace(0, 1, points)
+    t.flags.writeable = False
+    return t
+
+
+def _column(values):
+    return np.asarray(values, dtype=float).reshape(-1, 1)
+
+
+# ==================== Batch kernels ====================
+@timed("geometry")
+@memoized("geometry")
+def blob_batch(centers, radii, wobbles, points=200, endpoint=False, rng=None):
+    """Wobbly closed shapes, one row per blob.
+
+    ``endpoint=True`` repeats angle 0 at the end, like the Week 3 Task 6 blob.
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    cos, sin = trig_table(points, endpoint)
+    noise = (rng or np.random.RandomState()).rand(len(centers), points)
+    rr = _column(radii) * (1 + _column(wobbles)*(noise-0.5))
+    x = centers[:, :1] + rr * cos
+    y = centers[:, 1:] + rr * sin
+    return x, y
+
+
+@timed("geometry")
+@memoized("geometry")
+def sphere_batch(centers, radii, points=100):
+    """Circle outlines (closed, last point repeats the first), one row per sphere."""
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    cos, sin = trig_table(points, endpoint=True)
+    r = _column(radii)
+    return centers[:, :1] + r * cos, centers[:, 1:] + r * sin
+
+
+@timed("geometry")
+@memoized("geometry")
+def flower_batch(centers, petals, radii, points=50, layers=0, wobble=0.0, rng=None):
+    """Petal strokes of many flowers, one row per stroke.
+
+    With ``layers=0`` there is one stroke per petal, ordered flower → petal,
+    exactly what calling ``flower()`` per flower gives.  With ``layers > 0``
+    every petal is instead repeated ``layers`` times with extra gaussian
+    ``wobble``, ordered flower → petal → layer like the Week 4 page loops.
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    petals = [int(p) for p in petals]
+    t = ramp(points)
+    copies = max(layers, 1)
+    # Per flower the loops drew the petal jitter (x then y per petal) and then,
+    # if layered, the wobble for every petal/layer; one draw covers them all.
+    per_flower = [p*2*points + (p*layers*2*points if layers else 0) for p in petals]
+    z = (rng or np.random.RandomState()).standard_normal(sum(per_flower))
+
+    xs, ys = [], []
+    start = 0
+    for (cx, cy), p, r, n in zip(centers, petals, radii, per_flower):
+        block = z[start:start+n]; start += n
+        cos, sin = trig_table(p)
+        jitter = 0.01 * block[:p*2*points].reshape(p, 2, points)
+        x = cx + t * r * cos[:, None] + jitter[:, 0]
+        y = cy + t * r * sin[:, None] + jitter[:, 1]
+        if layers:
+            wob = wobble * block[p*2*points:].reshape(p, layers, 2, points)
+            x = x[:, None, :] + wob[:, :, 0]
+            y = y[:, None, :] + wob[:, :, 1]
+        xs.append(x.reshape(p*copies, points))
+        ys.append(y.reshape(p*copies, points))
+    if not xs:
+        return np.empty((0, points)), np.empty((0, points))
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+# ==================== Single shapes ====================
+def blob(center=(0.5, 0.5), r=0.3, points=200, wobble=0.15, rng=None):
+    x, y = blob_batch([center], [r], [wobble], points, rng=rng)
+    return x[0], y[0]
+
+def flower(center=(0.5,0.5), petals=8, radius=0.2, points=50, rng=None):
+    x, y = flower_batch([center], [petals], [radius], points, rng=rng)
+    return list(zip(x, y))
+
+def sphere(center=(0.5,0.5), radius=0.05, points=100):
+    x, y = sphere_batch([center], [radius], points)
+    return x[0], y[0]
@@ -0,0 +1,190 @@
+"""Perceptual index over large palettes: nearest colors, hue bands, well-spread samples.
+
+Colors are converted once from sRGB to CIELAB (D65), where Euclidean distance
+approximates how different two colors look (ΔE*76).  A uniform grid buckets
+the Lab points: the rows are sorted by cell, so the members of any block of
+cells are a few contiguous runs, and nearest / radius queries only look at
+the cells that can hold an answer.  Hue queries use the LCh hue angle,
+sorted once, so a band around a hue is two binary searches.
+
+    index = PALETTE_STORE.index()              # cached until the palette changes
+    index.nearest((0.9, 0.2, 0.3), k=5)        # rows of the 5 closest colors
+    index.palette(index.sample(6, rng))        # 6 well-separated colors
+    index.near_hue(200, width=15)              # every saturated color near a hue
+
+Every query returns row numbers into the palette it was built from.
+"""
+import numpy as np
+
+WHITE = np.array([0.95047, 1.0, 1.08883])  # D65 reference white
+SRGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]])
+OCCUPANCY = 4  # colors per grid cell the cell size aims for
+MIN_CELL = 2.0  # ΔE; about one just-noticeable difference
+MIN_CHROMA = 10.0  # grays below this chroma have no meaningful hue
+SPREAD_CELLS = 1024  # about this many representatives stand in for a large palette in sample()
+
+
+def srgb_to_lab(rgb):
+    """CIELAB of sRGB colors in 0..1, shape (..., 3)."""
+    rgb = np.clip(np.asarray(rgb, dtype=np.float64), 0.0, 1.0)
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ SRGB_TO_XYZ.T / WHITE
+    f = np.where(xyz > (6/29) ** 3, np.cbrt(xyz), xyz / (3 * (6/29) ** 2) + 4/29)
+    return np.stack([116*f[..., 1] - 16, 500*(f[..., 0] - f[..., 1]), 200*(f[..., 1] - f[..., 2])], axis=-1)
+
+
+class PaletteIndex:
+    """Lab grid, hue order and cell representatives of an (n, 3) RGB palette."""
+
+    def __init__(self, colors, cell=None):
+        self.rgb = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+        self.lab = srgb_to_lab(self.rgb)
+        n = len(self.lab)
+        lo = self.lab.min(axis=0) if n else np.zeros(3)
+        extent = np.maximum(self.lab.max(axis=0) - lo, 1e-9) if n else np.ones(3)
+        if cell is None:  # cells of about OCCUPANCY colors each if the palette filled its box
+            cell = max(MIN_CELL, (np.prod(extent) * OCCUPANCY / max(n, 1)) ** (1/3))
+        self.cell = float(cell)
+        self._origin = lo
+        self._dims = (extent // self.cell).astype(np.int64) + 1
+        ids = self._flat(self._coords(self.lab))
+        self._order = np.argsort(ids, kind="stable")
+        self._cells, self._starts, self._counts = np.unique(ids[self._order], return_index=True, return_counts=True)
+        # one color per block of cells, about SPREAD_CELLS blocks in all
+        factor = max(1, int(np.ceil((len(self._cells) / SPREAD_CELLS) ** (1/3))))
+        coarse = self._coords(self.lab[self._order]) // factor
+        coarse = (coarse[:, 0] * (self._dims[1] // factor + 1) + coarse[:, 1]) * (self._dims[2] // factor + 1) + coarse[:, 2]
+        self.representatives = np.sort(self._order[np.unique(coarse, return_index=True)[1]])
+
+        lch_hue = np.degrees(np.arctan2(self.lab[:, 2], self.lab[:, 1])) % 360
+        self.chroma = np.hypot(self.lab[:, 1], self.lab[:, 2])
+        self._hue_order = np.argsort(lch_hue, kind="stable")
+        self._hue_sorted = lch_hue[self._hue_order]
+
+    def __len__(self):
+        return len(self.lab)
+
+    @classmethod
+    def from_palette(cls, palette):
+        """Index a list of (r, g, b) tuples as the poster pages use them."""
+        return cls(np.asarray(palette, dtype=np.float64))
+
+    def palette(self, rows):
+        """The colors at ``rows`` as (r, g, b) tuples."""
+        return [tuple(c) for c in self.rgb[rows].tolist()]
+
+    # ---- grid ----
+    def _coords(self, lab):
+        return np.floor((lab - self._origin) / self.cell).astype(np.int64)
+
+    def _flat(self, coords):
+        return (coords[..., 0] * self._dims[1] + coords[..., 1]) * self._dims[2] + coords[..., 2]
+
+    def _block(self, center, r):
+        """Rows in the cells within ``r`` cells of ``center`` (clipped to the grid), and whether that is all of it."""
+        lo = np.maximum(center - r, 0)
+        hi = np.minimum(center + r, self._dims - 1)
+        if np.any(lo > hi):
+            return np.empty(0, dtype=np.int64), False
+        everything = bool(np.all(lo == 0) and np.all(hi == self._dims - 1))
+        if everything or np.prod(hi - lo + 1) >= len(self._cells):
+            return (np.arange(len(self)) if everything else self._scan(lo, hi)), everything
+        axes = np.meshgrid(*(np.arange(a, b + 1) for a, b in zip(lo, hi)), indexing="ij")
+        wanted = self._flat(np.stack([a.ravel() for a in axes], axis=-1))
+        pos = np.searchsorted(self._cells, wanted)
+        hit = pos < len(self._cells)
+        pos, wanted = pos[hit], wanted[hit]
+        pos = pos[self._cells[pos] == wanted]
+        return self._runs(pos), False
+
+    def _scan(self, lo, hi):
+        # more cells in the block than occupied ones: test the occupied cells instead
+        coords = self._coords(self.lab[self._order[self._starts]])
+        inside = np.all((coords >= lo) & (coords <= hi), axis=1)
+        return self._runs(np.flatnonzero(inside))
+
+    def _runs(self, pos):
+        """Rows of the occupied cells at positions ``pos``."""
+        if not len(pos):
+            return np.empty(0, dtype=np.int64)
+        counts = self._counts[pos]
+        offsets = np.repeat(self._starts[pos] - np.cumsum(counts) + counts, counts)
+        return self._order[offsets + np.arange(counts.sum())]
+
+    # ---- queries ----
+    def nearest(self, color, k=1, lab=False):
+        """Rows of the ``k`` colors closest to ``color`` (RGB, or Lab with ``lab=True``), closest first."""
+        q = np.asarray(color, dtype=np.float64) if lab else srgb_to_lab(color)
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        center = self._coords(q)
+        r = 0
+        while True:
+            rows, everything = self._block(center, r)
+            if len(rows) >= k or everything:
+                d = np.sum((self.lab[rows] - q) ** 2, axis=1)
+                best = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+                reach = np.sqrt(d[best].max())
+                # the block holds everything within r cells of q; widen once if the k-th color may be beaten
+                if everything or reach <= r * self.cell:
+                    return rows[best[np.argsort(d[best], kind="stable")]]
+                r = int(np.ceil(reach / self.cell))
+                rows, _ = self._block(center, r)
+                d = np.sum((self.lab[rows] - q) ** 2, axis=1)
+                return rows[np.argsort(d, kind="stable")[:k]]
+            r = 2*r + 1
+
+    def within(self, color, radius, lab=False):
+        """Rows of every color within ``radius`` ΔE of ``color``, closest first."""
+        q = np.asarray(color, dtype=np.float64) if lab else srgb_to_lab(color)
+        rows, _ = self._block(self._coords(q), int(np.ceil(radius / self.cell)))
+        d = np.sum((self.lab[rows] - q) ** 2, axis=1)
+        keep = d <= radius * radius
+        rows, d = rows[keep], d[keep]
+        return rows[np.argsort(d, kind="stable")]
+
+    def near_hue(self, hue, width=15.0, min_chroma=MIN_CHROMA):
+        """Rows whose LCh hue is within ``width`` degrees of ``hue``, in hue order.
+
+        Colors with chroma below ``min_chroma`` are left out.
+        """
+        lo, hi = (hue - width) % 360, (hue + width) % 360
+        a = np.searchsorted(self._hue_sorted, lo, side="left")
+        b = np.searchsorted(self._hue_sorted, hi, side="right")
+        if width >= 180:
+            rows = self._hue_order
+        elif lo <= hi:
+            rows = self._hue_order[a:b]
+        else:  # the band wraps past 0°
+            rows = np.concatenate([self._hue_order[a:], self._hue_order[:b]])
+        return rows[self.chroma[rows] >= min_chroma]
+
+    def sample(self, k, rng=None, rows=None):
+        """Rows of ``k`` well-separated colors (greedy farthest-point order).
+
+        The first color is drawn with ``rng`` (a ``random.Random``); each next
+        one is the color farthest from those already chosen.  ``rows``
+        restricts the choice, e.g. to :meth:`near_hue`.  Large palettes are
+        spread over :attr:`representatives`, long ``rows`` over every m-th
+        row, so a sample costs the same at any palette size.
+        """
+        candidates = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if rows is None and len(candidates) > SPREAD_CELLS:
+            candidates = self.representatives
+        elif len(candidates) > SPREAD_CELLS:  # every m-th row, about SPREAD_CELLS of them
+            candidates = candidates[::-(-len(candidates) // SPREAD_CELLS)]
+        k = min(k, len(candidates))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        lab = self.lab[candidates]
+        first = rng.randrange(len(candidates)) if rng is not None else 0
+        chosen = [first]
+        d = np.sum((lab - lab[first]) ** 2, axis=1)
+        for _ in range(k - 1):
+            nxt = int(np.argmax(d))
+            chosen.append(nxt)
+            np.minimum(d, np.sum((lab - lab[nxt]) ** 2, axis=1), out=d)
+        return candidates[chosen]
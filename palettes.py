@@ -0,0 +1,523 @@
+"""Palettes: the Week 5 CSV palette manager, uploaded palettes and the generated palette modes.
+
+pandas is only imported once a CSV is read or written.
+"""
+import colorsys
+import hashlib
+import io
+import json
+import os
+import random
+import struct
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+
+from palette_index import PaletteIndex
+from render_cache import RENDER_CACHE
+from timings import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# ==================== CSV Palette Manager (Week 5) ====================
+PALETTE_FILE = "palette.csv"
+COLUMNS = ["name", "r", "g", "b"]
+JOURNAL_COMPACT_BYTES = 64 * 1024  # fold the edit journal into the CSV past this size
+
+def init_palette_file(path=PALETTE_FILE):
+    if not os.path.exists(path):
+        import pandas as pd
+        df_init = pd.DataFrame([
+            {"name":"sky", "r":0.4, "g":0.7, "b":1.0},
+            {"name":"sun", "r":1.0, "g":0.8, "b":0.2},
+            {"name":"forest", "r":0.2, "g":0.6, "b":0.3},
+            {"name":"cloud", "r":0.9, "g":0.9, "b":0.95},
+            {"name":"ocean", "r":0.1, "g":0.3, "b":0.8},
+        ])
+        _write_atomic(path, df_init.to_csv(index=False).encode())
+
+def _frame(names, colors):
+    import pandas as pd
+    return pd.DataFrame({"name": names, "r": colors[:, 0], "g": colors[:, 1], "b": colors[:, 2]}, columns=COLUMNS)
+
+def _stamp(st):
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def _write_atomic(path, data):
+    """Write ``data`` to a temp file next to ``path`` and rename it into place."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+@contextmanager
+def file_lock(path):
+    """Exclusive advisory lock on ``path``, shared by threads and processes."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ==================== Binary palette ====================
+# <path>.bin mirrors the live palette (snapshot + journal) for fast loading:
+#   64-byte header: magic, the stamp of the CSV and journal it was built from, row count, name bytes
+#   float64 (n, 3) colors | uint64 (n + 1) name offsets | UTF-8 names
+BINARY_MAGIC = b"PALBIN1\0"
+BINARY_HEADER = struct.Struct("<8s5q2Q")
+BINARY_DATA = 64  # colors start here, 8-byte aligned
+
+def source_stamp(path):
+    """Identity of ``path`` plus its journal; changes with every snapshot or journal write."""
+    csv = os.stat(path)
+    try:
+        journal = os.stat(path + ".journal")
+        tail = (journal.st_ino, journal.st_size)
+    except FileNotFoundError:
+        tail = (0, 0)
+    return (*_stamp(csv), *tail)
+
+def write_palette_binary(path, names, colors, source=(0, 0, 0, 0, 0)):
+    """Write ``names`` and (n, 3) ``colors`` to the binary palette file ``path``, atomically."""
+    colors = np.ascontiguousarray(colors, dtype="<f8").reshape(-1, 3)
+    blobs = [str(name).encode() for name in names]
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    header = BINARY_HEADER.pack(BINARY_MAGIC, *source, len(colors), int(offsets[-1]))
+    _write_atomic(path, header.ljust(BINARY_DATA, b"\0") + colors.tobytes() + offsets.tobytes() + b"".join(blobs))
+
+class PaletteBinary:
+    """A binary palette file mapped read-only: ``colors`` is a view of the file, names decode on demand.
+
+    Every process that maps the file shares the same page-cache pages.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, *fields = BINARY_HEADER.unpack(f.read(BINARY_HEADER.size))
+            size = os.fstat(f.fileno()).st_size
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary palette")
+        self.source, n, name_bytes = tuple(fields[:5]), fields[5], fields[6]
+        if size != BINARY_DATA + 24*n + 8*(n + 1) + name_bytes:
+            raise ValueError(f"{path} is truncated")
+        self.path = path
+        self._data = (np.memmap(path, dtype=np.uint8, mode="r") if n else np.zeros(BINARY_DATA + 8, np.uint8)).view(np.ndarray)
+        self.colors = self._data[BINARY_DATA:BINARY_DATA + 24*n].view("<f8").reshape(n, 3)
+        self._offsets = self._data[BINARY_DATA + 24*n:BINARY_DATA + 24*n + 8*(n + 1)].view("<u8")
+        self._names = BINARY_DATA + 24*n + 8*(n + 1)
+
+    def __len__(self):
+        return len(self.colors)
+
+    def names(self):
+        blob = self._data[self._names:].tobytes()
+        bounds = self._offsets.tolist()
+        return [blob[a:b].decode() for a, b in zip(bounds, bounds[1:])]
+
+def read_palette_binary(path):
+    """:class:`PaletteBinary` of ``path``, or None when it is missing or unreadable."""
+    try:
+        return PaletteBinary(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def csv_to_binary(csv_path=PALETTE_FILE, binary_path=None):
+    """Write the palette ``csv_path`` (with its journal) as a binary palette; returns its path."""
+    store = PaletteStore(csv_path)
+    return store.save_binary(binary_path)
+
+def binary_to_csv(binary_path, csv_path=PALETTE_FILE):
+    """Replace the palette ``csv_path`` with the contents of a binary palette."""
+    binary = PaletteBinary(binary_path)
+    PaletteStore(csv_path).replace(binary.names(), np.array(binary.colors))
+
+
+
+class PaletteStore:
+    """``palette.csv`` plus an append-only journal of edits, kept parsed in memory.
+
+    The palette lives as an (n, 3) color array with a name -> rows index.
+    Edits are appended to ``<path>.journal`` (one JSON line each) under an
+    exclusive lock on ``<path>.lock``, so concurrent editors never overwrite
+    each other and a crash can at most leave a torn last line, which is
+    skipped.  Readers take no file lock: they parse the snapshot only when it
+    changes and otherwise replay the journal lines written since their last
+    look.  Once the journal grows past ``compact_bytes`` it is folded into a
+    new snapshot, written to a temp file and renamed over ``palette.csv``.
+    """
+
+    def __init__(self, path=PALETTE_FILE, compact_bytes=JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_bytes = compact_bytes
+        self._lock = threading.RLock()
+        self._snap_stamp = None  # identity of the snapshot file we parsed
+        self._journal_ino = None  # inode of the journal we are replaying
+        self._offset = 0  # bytes of that journal already applied
+        self._color_index = None  # (live snapshot, PaletteIndex of it)
+        self.binary_path = path + ".bin"
+        self._binary = None  # PaletteBinary last mapped by shared_colors()
+        self._reset([], np.empty((0, 3)))
+
+    def _reset(self, names, colors):
+        n = len(names)
+        self._names = list(names)
+        self._colors = np.empty((max(2*n, 8), 3))
+        self._colors[:n] = colors
+        self._alive = np.zeros(len(self._colors), dtype=bool)
+        self._alive[:n] = True
+        self._size = n
+        self._index = {}
+        for i, name in enumerate(self._names):
+            self._index.setdefault(name, []).append(i)
+        self._snapshot = None
+
+    # ---- sync: snapshot + journal tail ----
+    def _load_snapshot(self):
+        import pandas as pd
+        with open(self.path, "rb") as f:
+            self._snap_stamp = _stamp(os.fstat(f.fileno()))
+            df = pd.read_csv(f)
+        self._reset(df["name"].tolist(), df[["r", "g", "b"]].to_numpy(dtype=float))
+        self._journal_ino, self._offset = None, 0
+
+    def _sync(self):
+        # Compaction replaces the journal before the snapshot, so reading the
+        # snapshot first can only pair it with a journal that is as new or
+        # newer: at worst the view is briefly stale, never double-applied.
+        init_palette_file(self.path)
+        if _stamp(os.stat(self.path)) != self._snap_stamp:
+            self._load_snapshot()
+        try:
+            journal = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return
+        with journal:
+            ino = os.fstat(journal.fileno()).st_ino
+            if ino != self._journal_ino:
+                if self._offset:  # the journal we were reading got compacted away
+                    self._load_snapshot()
+                self._journal_ino, self._offset = ino, 0
+            journal.seek(self._offset)
+            tail = journal.read()
+        end = tail.rfind(b"\n") + 1  # a line still being written waits for the next sync
+        for line in tail[:end].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue  # torn line from a crashed writer
+        self._offset += end
+
+    def _apply(self, rec):
+        op, name = rec["op"], rec["name"]
+        if op == "add":
+            if self._size == len(self._colors):  # grow by doubling: amortized O(1) appends
+                self._colors = np.concatenate([self._colors, np.empty_like(self._colors)])
+                self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+            i = self._size
+            self._colors[i] = rec["rgb"]
+            self._alive[i] = True
+            self._names.append(name)
+            self._index.setdefault(name, []).append(i)
+            self._size += 1
+        elif op == "update":  # first row called name; unknown names are ignored
+            rows = self._index.get(name)
+            if rows:
+                for channel, value in enumerate(rec["rgb"]):
+                    if value is not None:
+                        self._colors[rows[0], channel] = value
+        elif op == "delete":  # every row called name
+            rows = self._index.pop(name, None)
+            if rows:
+                self._alive[rows] = False
+        self._snapshot = None
+
+    def _live(self):
+        """(names, colors, rows) of the rows not deleted, cached until the next edit."""
+        if self._snapshot is None:
+            rows = np.flatnonzero(self._alive[:self._size])
+            colors = self._colors[rows]
+            colors.flags.writeable = False
+            self._snapshot = ([self._names[i] for i in rows], colors, rows)
+        return self._snapshot
+
+    # ---- reads ----
+    def colors(self):
+        """Read-only (n, 3) float array of the palette colors, in file order."""
+        with self._lock:
+            self._sync()
+            return self._live()[1]
+
+    def names(self):
+        with self._lock:
+            self._sync()
+            return list(self._live()[0])
+
+    def palette(self):
+        """The colors as a list of (r, g, b) tuples, as the poster pages use them."""
+        return [tuple(c) for c in self.colors().tolist()]
+
+    def index(self):
+        """:class:`PaletteIndex` of the colors, rebuilt only after an edit."""
+        with self._lock:
+            self._sync()
+            live = self._live()
+            if self._color_index is None or self._color_index[0] is not live:
+                self._color_index = (live, PaletteIndex(live[1]))
+            return self._color_index[1]
+
+    def frame(self):
+        """The palette as a DataFrame with the CSV's columns."""
+        with self._lock:
+            self._sync()
+            return _frame(*self._live()[:2])
+
+    def __contains__(self, name):
+        with self._lock:
+            self._sync()
+            return name in self._index
+
+    # ---- edits ----
+    def _append(self, rec):
+        line = (json.dumps(rec) + "\n").encode()
+        with self._lock, file_lock(self.lock_path):
+            with open(self.journal_path, "ab+") as f:  # writes append; reads seek (portable, unlike os.pread)
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line  # seal a torn line left by a crash
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._sync()
+            if size + len(line) > self.compact_bytes:
+                self._compact()
+
+    def add(self, name, r, g, b):
+        self._append({"op": "add", "name": name, "rgb": [float(r), float(g), float(b)]})
+
+    def update(self, name, r=None, g=None, b=None):
+        """Change the first row called ``name``; unknown names are ignored."""
+        rgb = [None if v is None else float(v) for v in (r, g, b)]
+        self._append({"op": "update", "name": name, "rgb": rgb})
+
+    def delete(self, name):
+        """Remove every row called ``name``."""
+        self._append({"op": "delete", "name": name})
+
+    def _compact(self):
+        # caller holds the file lock, so the journal cannot grow meanwhile
+        self._sync()
+        names, colors, _ = self._live()
+        _write_atomic(self.journal_path, b"")
+        _write_atomic(self.path, _frame(names, colors).to_csv(index=False).encode())
+        self._load_snapshot()
+
+    def flush(self):
+        """Fold the journal into ``palette.csv`` now."""
+        with self._lock, file_lock(self.lock_path):
+            self._compact()
+
+    def replace(self, names, colors):
+        """Make ``names`` and ``colors`` the whole palette (a new snapshot, empty journal)."""
+        with self._lock, file_lock(self.lock_path):
+            _write_atomic(self.journal_path, b"")
+            _write_atomic(self.path, _frame(list(names), np.asarray(colors, dtype=float)).to_csv(index=False).encode())
+            self._load_snapshot()
+
+    # ---- binary copy ----
+    def save_binary(self, path=None):
+        """Write the live palette to ``path`` (default ``<path>.bin``), stamped with its source."""
+        path = path or self.binary_path
+        with self._lock:
+            init_palette_file(self.path)
+            source = source_stamp(self.path)  # before reading: a later edit can only make the copy look stale
+            self._sync()
+            names, colors, _ = self._live()
+            write_palette_binary(path, names, colors, source)
+        return path
+
+    def shared_colors(self):
+        """Read-only (n, 3) colors mapped from the binary copy, refreshed first when stale.
+
+        While the copy matches ``palette.csv`` and its journal this costs two
+        ``stat`` calls; when it cannot be written (read-only directory) the
+        in-memory colors are returned instead.
+        """
+        init_palette_file(self.path)
+        source = source_stamp(self.path)
+        binary = self._binary
+        if binary is None or binary.source != source:
+            binary = read_palette_binary(self.binary_path)
+            if binary is None or binary.source != source:
+                try:
+                    self.save_binary()
+                except OSError:
+                    return self.colors()
+                binary = read_palette_binary(self.binary_path)
+                if binary is None:
+                    return self.colors()
+            self._binary = binary
+        return binary.colors
+
+
+PALETTE_STORE = PaletteStore()
+
+def read_palette():
+    return PALETTE_STORE.frame()
+
+def add_color(name, r, g, b):
+    PALETTE_STORE.add(name, r, g, b)
+
+def update_color(name, r=None, g=None, b=None):
+    PALETTE_STORE.update(name, r, g, b)
+
+def delete_color(name):
+    PALETTE_STORE.delete(name)
+
+def flush_palette():
+    PALETTE_STORE.flush()
+
+@timed("csv")
+def load_csv_palette():
+    """The CSV palette as a read-only (n, 3) array, memory-mapped from ``palette.csv.bin``."""
+    return PALETTE_STORE.shared_colors()
+
+@timed("palette")
+def make_palette(k=6, mode="pastel", base_h=0.60, csv_override=None, rng=None):
+    """``k`` colors for ``mode``, drawn from ``rng`` (a ``random.Random``; fresh if None)."""
+    if mode == "csv":
+        if csv_override is not None:
+            return csv_override
+        return load_csv_palette()
+    rng = rng or random.Random()
+    cols = []
+    for _ in range(k):
+        if mode == "pastel":
+            h = rng.random(); s = rng.uniform(0.15,0.35); v = rng.uniform(0.9,1.0)
+        elif mode == "vivid":
+            h = rng.random(); s = rng.uniform(0.8,1.0);  v = rng.uniform(0.8,1.0)
+        elif mode == "mono":
+            h = base_h;         s = rng.uniform(0.2,0.6);   v = rng.uniform(0.5,1.0)
+        else: # random
+            h = rng.random(); s = rng.uniform(0.3,1.0); v = rng.uniform(0.5,1.0)
+        cols.append(colorsys.hsv_to_rgb(h, s, v))  # same values as matplotlib's hsv_to_rgb
+    return cols
+
+
+# ==================== Uploaded palettes ====================
+UPLOAD_MAX_BYTES = int(os.environ.get("POSTER_UPLOAD_MAX_BYTES", 16 * 1024 * 1024))
+UPLOAD_MAX_ROWS = int(os.environ.get("POSTER_UPLOAD_MAX_ROWS", 100_000))
+UPLOAD_CHUNK_ROWS = 10_000
+
+class PaletteUploadError(ValueError):
+    """An uploaded palette CSV that cannot be used; the message is meant for the user."""
+
+@dataclass
+class UploadedPalette:
+    colors: np.ndarray  # (n, 3) float32, read-only
+    names: list = None  # None when the file has no name column
+    duplicates: int = 0  # rows dropped because their name came earlier
+
+def parse_palette_csv(data, max_rows=UPLOAD_MAX_ROWS, chunk_rows=UPLOAD_CHUNK_ROWS):
+    """Parse ``name,r,g,b`` CSV bytes ``chunk_rows`` rows at a time.
+
+    Each chunk is checked as it is read, so a bad or oversized file fails at
+    its first bad chunk: r, g and b must be numbers in 0..1 and at most
+    ``max_rows`` rows are read.  A name seen before drops its row (the first
+    row with a name wins, as in :class:`PaletteStore`).
+    """
+    import pandas as pd
+
+    if len(data) > UPLOAD_MAX_BYTES:
+        raise PaletteUploadError(f"file is larger than {UPLOAD_MAX_BYTES // (1024 * 1024)} MiB")
+    parts, names = [], []
+    rows = 0
+    try:
+        reader = pd.read_csv(io.BytesIO(data), chunksize=chunk_rows, skipinitialspace=True)
+        for chunk in reader:
+            chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+            missing = [c for c in ("r", "g", "b") if c not in chunk.columns]
+            if missing:
+                raise PaletteUploadError(f"missing column {', '.join(missing)} (expected name,r,g,b)")
+            if rows + len(chunk) > max_rows:
+                raise PaletteUploadError(f"more than {max_rows:,} rows")
+            rgb = np.column_stack([pd.to_numeric(chunk[c], errors="coerce").to_numpy(np.float64) for c in "rgb"])
+            bad = np.flatnonzero(~np.all((rgb >= 0) & (rgb <= 1), axis=1))
+            if len(bad):
+                raise PaletteUploadError(f"line {rows + bad[0] + 2}: r, g and b must be numbers between 0 and 1")
+            if "name" in chunk.columns:
+                names.extend(chunk["name"].astype(str).tolist())
+            parts.append(rgb.astype(np.float32))
+            rows += len(chunk)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as exc:
+        raise PaletteUploadError(f"not a readable CSV file ({exc})") from None
+    if not rows:
+        raise PaletteUploadError("no colors in the file")
+    colors = np.concatenate(parts)
+    duplicates = 0
+    if names:
+        keep = ~pd.Index(names).duplicated(keep="first")
+        duplicates = int(len(keep) - keep.sum())
+        if duplicates:
+            colors, names = colors[keep], [n for n, k in zip(names, keep) if k]
+    colors.flags.writeable = False
+    return UploadedPalette(colors, names or None, duplicates)
+
+def uploaded_palette(data):
+    """:func:`parse_palette_csv` of ``data``, cached by content hash (failures too).
+
+    Every rerun with the same file attached, in any session, reuses the
+    first parse.
+    """
+    key = ("palette_upload", hashlib.sha256(data).hexdigest())
+    result = RENDER_CACHE.get(key)
+    if result is None:
+        try:
+            result = parse_palette_csv(data)
+        except PaletteUploadError as exc:
+            result = ("error", str(exc))  # not the exception: its traceback grows with every raise
+        RENDER_CACHE.put(key, result)
+    if isinstance(result, tuple):
+        raise PaletteUploadError(result[1])
+    return result
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert between palette.csv and the binary palette format.")
+    parser.add_argument("direction", choices=["to-binary", "to-csv"])
+    parser.add_argument("binary", nargs="?", help=f"binary palette (default: {PALETTE_FILE}.bin)")
+    parser.add_argument("--csv", default=PALETTE_FILE)
+    args = parser.parse_args(argv)
+    if args.direction == "to-binary":
+        print(f"Wrote {csv_to_binary(args.csv, args.binary)}")
+    else:
+        binary_to_csv(args.binary or args.csv + ".bin", args.csv)
+        print(f"Wrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
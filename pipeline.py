@@ -0,0 +1,90 @@
+"""Staged poster pipeline: parameters → geometry → styled scene → encoded bytes.
+
+The app memoizes every stage on only the inputs it depends on:
+
+* geometry: the batch kernels in ``geometry.py``, keyed on their arguments
+  and on the state of the ``RandomState`` they draw noise from.  A hit
+  restores the generator to the state the kernel would have left it in,
+  so the builder goes on drawing exactly the same numbers;
+* styled scene: the builder's :class:`scene.Scene` (colors, alphas, text),
+  keyed on page, seed, parameters and palette, but not on the renderer;
+* encoded bytes: PNG per renderer and dpi, and SVG, in ``RENDER_CACHE``
+  and ``DISK_CACHE`` (see ``app.py``).
+
+A palette or style change therefore rebuilds the scene around cached
+shapes, and switching renderers or downloading reuses the scene.  Colors
+are drawn from the same ``random.Random`` as the layout, so a change that
+alters how many numbers the palette draws (e.g. to ``csv`` or ``mono``)
+also moves the shapes, and rightly misses the geometry cache.
+
+Geometry is only memoized inside ``with staged():``, so benchmarks and batch
+scripts keep computing every call.
+"""
+import contextvars
+import functools
+import hashlib
+import inspect
+from contextlib import contextmanager
+
+import numpy as np
+
+from render_cache import RENDER_CACHE
+
+_cache = contextvars.ContextVar("poster_stage_cache", default=None)
+
+
+@contextmanager
+def staged(cache=RENDER_CACHE):
+    """Memoize the geometry stage in ``cache`` for the ``with`` block."""
+    token = _cache.set(cache)
+    try:
+        yield
+    finally:
+        _cache.reset(token)
+
+def _digest(arguments, rng):
+    h = hashlib.sha1()
+    for name, value in arguments.items():
+        value = np.asarray(value, dtype=np.float64)
+        h.update(f"{name}{value.shape}".encode())
+        h.update(value.tobytes())
+    if rng is not None:
+        _, keys, pos, has_gauss, gauss = rng.get_state()
+        h.update(keys.tobytes())
+        h.update(repr((pos, has_gauss, gauss)).encode())
+    return h.hexdigest()
+
+def memoized(stage):
+    """Memoize a kernel returning arrays, inside :func:`staged`.
+
+    Results are shared between scenes, so they are returned read-only.
+    Calls with an unseeded (``rng=None``) generator are never memoized.
+    """
+    def wrap(fn):
+        sig = inspect.signature(fn)
+        random = "rng" in sig.parameters
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            cache = _cache.get()
+            if cache is None:
+                return fn(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            rng = bound.arguments.pop("rng", None)
+            if random and rng is None:
+                return fn(*args, **kwargs)
+            key = (stage, fn.__name__, _digest(bound.arguments, rng))
+            hit = cache.get(key)
+            if hit is not None:
+                result, state = hit
+                if rng is not None:
+                    rng.set_state(state)
+                return result
+            result = fn(*args, **kwargs)
+            for array in result:
+                array.flags.writeable = False
+            cache.put(key, (result, rng.get_state() if rng is not None else None))
+            return result
+        return inner
+    return wrap
@@ -0,0 +1,281 @@
+"""Scene builders for every page of the app (Week 2–5 + Final).
+
+Each builder creates its own random generators from the seed, draws the
+poster's shapes and returns a :class:`scene.Scene`.  No global random state
+is touched, so builders can run concurrently on threads or processes, and
+they have no Streamlit dependency, so the same posters can be rendered by
+the app, the benchmarks or batch scripts.
+"""
+import random
+
+import numpy as np
+
+from geometry import blob_batch, flower_batch, sphere_batch
+from palettes import make_palette
+from scene import Scene
+
+
+def seeded(seed):
+    """Per-render generators: ``(random.Random, np.random.RandomState)``.
+
+    They produce the same streams ``random.seed(seed)`` and
+    ``np.random.seed(seed)`` gave the global generators, so a seed still
+    draws the same poster.
+    """
+    return random.Random(seed), np.random.RandomState(seed)
+
+
+# ==================== WEEK 2 ====================
+def week2_scene(seed, n_layers=10, wobble_range=(0.1, 0.4)):
+    wobble_min, wobble_max = wobble_range
+    # generate_palette equivalent
+    rand, nprand = seeded(seed)
+    palette = [tuple(0.7 + 0.3*np.array([rand.random() for _ in range(3)])) for _ in range(n_layers)]
+
+    scene = Scene(figsize=(6,8), facecolor=(0.98, 0.97, 0.95))
+    wobbles = [rand.uniform(wobble_min, wobble_max) for _ in range(n_layers)]
+    radii = 1.2 - np.arange(n_layers) * 0.08
+    xs, ys = blob_batch([(0.5, 0.5)]*n_layers, radii, wobbles, rng=nprand)
+    for i in range(n_layers):
+        color = palette[i % len(palette)]
+        # the notebook's 0.4 + 0.05*i passes 1 above 12 layers, which matplotlib refuses
+        scene.fill(xs[i], ys[i], color, min(1.0, 0.4 + i*0.05), edgecolor=(0,0,0,0))
+    return scene
+
+
+# ==================== WEEK 3 ====================
+WEEK3_PRESETS = {
+    "Task 1 (Default)":         {"n_layers": 8,  "wobble_range": (0.05, 0.25), "r_range": (0.15, 0.45), "palette_style": "random"},
+    "Task 2 • ver1":            {"n_layers": 3,  "wobble_range": (0.01, 0.05), "r_range": (0.15, 0.35), "palette_style": "random"},
+    "Task 2 • ver2":            {"n_layers": 20, "wobble_range": (0.2, 0.5),   "r_range": (0.25, 0.6),  "palette_style": "random"},
+    "Task 3 • Pastel":          {"n_layers": 8,  "wobble_range": (0.05, 0.25), "r_range": (0.15, 0.45), "palette_style": "pastel"},
+    "Task 3 • Vivid":           {"n_layers": 8,  "wobble_range": (0.05, 0.25), "r_range": (0.15, 0.45), "palette_style": "vivid"},
+    "Task 3 • Monochrome Blue": {"n_layers": 8,  "wobble_range": (0.05, 0.25), "r_range": (0.15, 0.45), "palette_style": "mono_blue"},
+}
+
+BASE_COLORS = {
+    "pastel": [(1.0,0.8,0.8),(1.0,0.9,0.7),(0.8,1.0,0.8),(0.7,0.9,1.0),(0.9,0.8,1.0)],
+    "vivid": [(1,0,0),(0,1,0),(0,0,1),(1,1,0),(1,0,1)],
+    "mono_blue": [(0.2,0.4,1.0),(0.3,0.5,1.0),(0.4,0.6,1.0),(0.5,0.7,1.0),(0.6,0.8,1.0)],
+}
+
+def week3_scene(seed, preset="Task 1 (Default)"):
+    config = WEEK3_PRESETS[preset]
+    n_layers = config["n_layers"]
+    wobble_lo, wobble_hi = config["wobble_range"]
+    r_lo, r_hi = config["r_range"]
+    rand, nprand = seeded(seed)
+
+    # palette
+    if config["palette_style"] in BASE_COLORS:
+        base_colors = BASE_COLORS[config["palette_style"]]
+    else:
+        base_colors = [(rand.random(),rand.random(),rand.random()) for _ in range(6)]
+    palette = rand.choices(base_colors, k=6)
+
+    scene = Scene(figsize=(7,10), facecolor=(0.98,0.98,0.97))
+
+    layers = []
+    for _ in range(n_layers):
+        cx, cy = rand.random(), rand.random()
+        rr = rand.uniform(r_lo, r_hi)
+        wob = rand.uniform(wobble_lo, wobble_hi)
+        layers.append(((cx,cy), rr, wob, rand.choice(palette), rand.uniform(0.25, 0.6)))
+    centers, radii, wobbles, colors, alphas = zip(*layers)
+    xs, ys = blob_batch(centers, radii, wobbles, rng=nprand)
+    for x, y, color, alpha in zip(xs, ys, colors, alphas):
+        scene.fill(x, y, color, alpha, edgecolor=(0,0,0,0))
+    return scene
+
+
+# Week 3 Task 6: generate_poster() styles, used by the batch renderer.
+TASK6_PRESETS = {
+    "Minimal":        {"n_layers": 5,  "wobble_range": (0.02,0.1),  "palette_style": "Pastel"},
+    "Vivid":          {"n_layers": 15, "wobble_range": (0.1,0.3),   "palette_style": "Vivid"},
+    "NoiseTouch":     {"n_layers": 12, "wobble_range": (0.3,0.5),   "palette_style": "Pastel"},
+    "Pastel":         {"n_layers": 8,  "wobble_range": (0.05,0.25), "palette_style": "Pastel"},
+    "VividColors":    {"n_layers": 8,  "wobble_range": (0.05,0.25), "palette_style": "Vivid"},
+    "MonochromeBlue": {"n_layers": 8,  "wobble_range": (0.05,0.25), "palette_style": "Monochrome"},
+}
+
+TASK6_COLORS = {"Pastel": BASE_COLORS["pastel"], "Vivid": BASE_COLORS["vivid"], "Monochrome": BASE_COLORS["mono_blue"]}
+
+def task6_scene(style="Pastel", seed=None, n_layers=None, wobble_range=None, r_range=(0.15,0.45)):
+    """The Task 6 ``generate_poster`` as a Scene (same seed -> same poster)."""
+    config = dict(TASK6_PRESETS.get(style, TASK6_PRESETS["Pastel"]))
+    if n_layers is not None:
+        config["n_layers"] = n_layers
+    if wobble_range is not None:
+        config["wobble_range"] = wobble_range
+    rand, nprand = seeded(seed)  # seed=None: fresh, unseeded generators
+
+    palette = rand.choices(TASK6_COLORS[config["palette_style"]], k=6)
+    scene = Scene(figsize=(7,10), facecolor=(0.98,0.98,0.97), xlim=(0,1), ylim=(0,1))
+
+    layers = []
+    for _ in range(config["n_layers"]):
+        cx, cy = rand.random(), rand.random()
+        rr = rand.uniform(*r_range)
+        wob = rand.uniform(*config["wobble_range"])
+        layers.append(((cx,cy), rr, wob, rand.choice(palette), rand.uniform(0.25,0.6)))
+    if layers:
+        centers, radii, wobbles, colors, alphas = zip(*layers)
+        xs, ys = blob_batch(centers, radii, wobbles, endpoint=True, rng=nprand)
+        for x, y, color, alpha in zip(xs, ys, colors, alphas):
+            scene.fill(x, y, color, alpha, edgecolor=(0,0,0,0))
+
+    scene.text(0.05, 0.95, "Generative Poster", fontsize=18, weight="bold")
+    scene.text(0.05, 0.91, f"Style: {style}, Seed: {seed}", fontsize=11)
+    return scene
+
+
+# ==================== WEEK 4 ====================
+FLOWER_PALETTES = [
+    ["#FFB3BA", "#FFDFBA", "#FFFFBA", "#BAFFC9", "#BAE1FF"],
+    ["#F7C8E0", "#FFDDCC", "#FFE6EB", "#D6F5F5", "#C9E4FF"],
+    ["#FDE2E4", "#FAD2E1", "#E2ECE9", "#BEE1E6", "#C6DEF1"],
+]
+
+SPHERE_PALETTES = [
+    ["#FF4C4C", "#FFD93D", "#6BCB77", "#4D96FF", "#FF6F91"],  # bright pastel
+    ["#FFB3BA", "#FFDFBA", "#FFFFBA", "#BAFFC9", "#BAE1FF"],  # soft pastel
+]
+
+def week4_flowers_scene(seed, layers=3, wobble=0.01, palette_index=0, n_flowers=3):
+    colors = FLOWER_PALETTES[palette_index % len(FLOWER_PALETTES)]
+    rand, nprand = seeded(seed)
+    centers = [(rand.random(), rand.random()) for _ in range(n_flowers)]
+
+    scene = Scene(figsize=(6,6), xlim=(0,1), ylim=(0,1))
+    petals, radii, stroke_colors = [], [], []
+    for _ in centers:
+        petals.append(rand.randint(5,12)); radii.append(rand.uniform(0.1,0.25))
+        stroke_colors += [rand.choice(colors) for _ in range(petals[-1]*layers)]
+    xs, ys = flower_batch(centers, petals, radii, layers=layers, wobble=wobble, rng=nprand)
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        l = i % layers
+        scene.stroke(x, y, stroke_colors[i], linewidth=3 + (layers-l), alpha=0.6, capstyle='round')
+    scene.title = f"🌸 Spring Abstract | Layers: {layers}, Wobble: {wobble:.3f}, Palette: {palette_index}"
+    return scene
+
+def week4_spheres_scene(seed, layers=5, shadow_offset=0.02, palette_index=0, n_spheres=6):
+    colors = SPHERE_PALETTES[palette_index % len(SPHERE_PALETTES)]
+    rand, nprand = seeded(seed)
+    scene = Scene(figsize=(6,6), xlim=(0,1), ylim=(0,1))
+    spheres = [((rand.random(), rand.random()), rand.uniform(0.03, 0.1), rand.choice(colors)) for _ in range(n_spheres)]
+    centers, radii, fills = zip(*spheres)
+    xs, ys = sphere_batch(centers, radii)
+    shifts = shadow_offset * (layers - np.arange(layers))[:, None]
+    for x, y, color in zip(xs, ys, fills):
+        for xsh, ysh in zip(x + shifts, y - shifts):
+            scene.fill(xsh, ysh, 'gray', 0.2)
+        scene.fill(x, y, color, 0.9)
+    scene.title = f"🍓 Fruity 3D Poster | Layers: {layers}, Shadow: {shadow_offset}, Palette: {palette_index}"
+    return scene
+
+
+class Week4Canvas:
+    """A Week 4 poster that grows one shape at a time, like the notebook's
+    ``flowers`` / ``spheres`` lists with their Add buttons.
+
+    Shapes already added are never regenerated: each :meth:`add` appends
+    only the new shape's strokes or fills to :attr:`scene`, drawn with the
+    settings of that moment.  The generators are seeded once, so a seed
+    replays the same shapes for the same clicks.
+    """
+
+    def __init__(self, kind="flowers", seed=None):
+        if kind not in ("flowers", "spheres"):
+            raise ValueError(f"unknown kind {kind!r}; expected 'flowers' or 'spheres'")
+        self.kind, self.seed = kind, seed
+        self.rand, self.nprand = seeded(seed)
+        self.scene = Scene(figsize=(6,6), xlim=(0,1), ylim=(0,1))
+        self.count = 0
+
+    def add(self, center=(0.5, 0.5), layers=None, wobble=0.01, shadow_offset=0.02, palette_index=0):
+        """Append one flower (``wobble``) or sphere (``shadow_offset``) at ``center``."""
+        rand, scene = self.rand, self.scene
+        if self.kind == "flowers":
+            layers = 3 if layers is None else layers
+            colors = FLOWER_PALETTES[palette_index % len(FLOWER_PALETTES)]
+            petals, radius = rand.randint(5,12), rand.uniform(0.1,0.25)
+            stroke_colors = [rand.choice(colors) for _ in range(petals*layers)]
+            xs, ys = flower_batch([center], [petals], [radius], layers=layers, wobble=wobble, rng=self.nprand)
+            for i, (x, y) in enumerate(zip(xs, ys)):
+                scene.stroke(x, y, stroke_colors[i], linewidth=3 + (layers - i % layers), alpha=0.6, capstyle='round')
+        else:
+            layers = 5 if layers is None else layers
+            colors = SPHERE_PALETTES[palette_index % len(SPHERE_PALETTES)]
+            radius, color = rand.uniform(0.03, 0.1), rand.choice(colors)
+            xs, ys = sphere_batch([center], [radius])
+            shifts = shadow_offset * (layers - np.arange(layers))[:, None]
+            for xsh, ysh in zip(xs[0] + shifts, ys[0] - shifts):
+                scene.fill(xsh, ysh, 'gray', 0.2)
+            scene.fill(xs[0], ys[0], color, 0.9)
+        self.count += 1
+        return self
+
+
+# ==================== WEEK 5 ====================
+def week5_scene(seed, mode="pastel", k=6, n_layers=8, wobble=0.15, csv_override=None):
+    rand, nprand = seeded(seed)
+    palette = make_palette(k=k, mode=mode, csv_override=csv_override, rng=rand)
+    scene = Scene(figsize=(6,8), facecolor=(0.97,0.97,0.97))
+
+    layers = []
+    for _ in range(n_layers):
+        cx, cy = rand.random(), rand.random()
+        rr = rand.uniform(0.15, 0.45)
+        layers.append(((cx,cy), rr, rand.choice(palette), rand.uniform(0.3, 0.6)))
+    centers, radii, colors, alphas = zip(*layers)
+    xs, ys = blob_batch(centers, radii, [wobble]*n_layers, rng=nprand)
+    for x, y, color, alpha in zip(xs, ys, colors, alphas):
+        scene.fill(x, y, color, alpha, edgecolor=(0,0,0,0))
+
+    scene.text(0.05, 0.95, f"Interactive Poster • {mode}", fontsize=12, weight="bold")
+    return scene
+
+
+# ==================== FINAL ====================
+def final_scene(seed, shape="Blob", palette_mode="pastel", n_layers=8, wobble=0.15, csv_override=None):
+    rand, nprand = seeded(seed)
+    palette = make_palette(k=6, mode=palette_mode, csv_override=csv_override, rng=rand)
+    scene = Scene(figsize=(6,8), facecolor=(0.98,0.98,0.97))
+
+    colors, alphas, centers, radii, petals = [], [], [], [], []
+    for _ in range(n_layers):
+        colors.append(rand.choice(palette))
+        alphas.append(rand.uniform(0.3,0.6))
+        centers.append((rand.random(), rand.random()))
+        if shape == "Flower":
+            petals.append(rand.randint(5,12))
+        radii.append(rand.uniform(0.15, 0.45) if shape == "Blob" else
+                     rand.uniform(0.1,0.25) if shape == "Flower" else rand.uniform(0.03,0.1))
+    if shape == "Blob":
+        xs, ys = blob_batch(centers, radii, [wobble]*n_layers, rng=nprand)
+        for x, y, color, alpha in zip(xs, ys, colors, alphas):
+            scene.fill(x, y, color, alpha, edgecolor=(0,0,0,0))
+    elif shape == "Flower":
+        xs, ys = flower_batch(centers, petals, radii, rng=nprand)
+        owner = np.repeat(np.arange(n_layers), petals)
+        for x, y, i in zip(xs, ys, owner):
+            scene.stroke(x, y, colors[i], linewidth=3, alpha=alphas[i])
+    else: # Sphere
+        xs, ys = sphere_batch(centers, radii)
+        for x, y, color, alpha in zip(xs, ys, colors, alphas):
+            scene.fill(x, y, color, alpha)
+
+    scene.text(0.05,0.95,"Generative Poster Studio", fontsize=14, weight='bold')
+    scene.text(0.05,0.91,f"Shape: {shape} • Palette: {palette_mode} • Seed: {seed}", fontsize=10)
+    return scene
+
+
+# Page id -> builder, for code that renders posters outside the app.
+BUILDERS = {
+    "week2": week2_scene,
+    "week3": week3_scene,
+    "week4_flowers": week4_flowers_scene,
+    "week4_spheres": week4_spheres_scene,
+    "week5": week5_scene,
+    "final": final_scene,
+}
@@ -0,0 +1,532 @@
+"""Pure-NumPy raster backend for poster scenes.
+
+Posters are alpha-blended filled polygons and thick polylines on a flat
+background, so they do not need a full plotting library to be drawn.  This
+backend scan-converts every shape into a premultiplied float32 RGBA buffer
+with anti-aliasing (exact horizontal span coverage, ``SUBSAMPLES`` rows per
+pixel vertically) and encodes the buffer straight to PNG with zlib.
+
+It reproduces the matplotlib page layout: the canvas is the axes box of the
+default subplot, data limits come from ``scene.xlim``/``ylim`` or are
+autoscaled with matplotlib's 5% margins, and fills get the 1 pt outline that
+``ax.fill`` draws.  Text labels and titles are not drawn; use the matplotlib
+backend when they matter.
+"""
+import io
+import math
+import struct
+import zlib
+
+import numpy as np
+
+from scene import Fill
+from timings import stage
+
+# Axes box of a default matplotlib subplot, as fractions of the figure.
+AXES_BOX = (0.125, 0.11, 0.9, 0.88)  # left, bottom, right, top
+MARGIN = 0.05  # rcParams["axes.xmargin"] / ["axes.ymargin"]
+PATCH_LINEWIDTH = 1.0  # rcParams["patch.linewidth"], in points
+SUBSAMPLES = 4  # vertical samples per pixel row
+WHITE = (1.0, 1.0, 1.0, 1.0)
+PNG_LEVEL = 1  # zlib level: flat poster colors compress well even at 1, and 6 costs twice the time
+
+
+# ==================== Colors ====================
+_NAMED = {"gray": (0.5019607843137255,) * 3, "grey": (0.5019607843137255,) * 3,
+          "white": (1.0, 1.0, 1.0), "black": (0.0, 0.0, 0.0)}
+
+def to_rgba(color, alpha=None):
+    """Parse an RGB(A) tuple, ``#rrggbb[aa]`` string or basic color name."""
+    if isinstance(color, str):
+        if color.startswith("#") and len(color) in (7, 9):
+            rgba = tuple(int(color[i:i+2], 16) / 255 for i in range(1, len(color), 2))
+        elif color.lower() in _NAMED:
+            rgba = _NAMED[color.lower()]
+        else:  # anything exotic: let matplotlib resolve it
+            from matplotlib.colors import to_rgba as mpl_to_rgba
+            rgba = mpl_to_rgba(color)
+    else:
+        rgba = tuple(float(c) for c in color)
+    if len(rgba) == 3:
+        rgba = rgba + (1.0,)
+    if alpha is not None:
+        rgba = rgba[:3] + (float(alpha),)
+    return rgba
+
+
+# ==================== Geometry → edges ====================
+# Every helper returns edges (x0, y0, x1, y1) of closed rings in pixel space.
+# Rings that are meant to be unioned all wind the same way, so the nonzero
+# rule in coverage() fills their union.
+ARC_POINTS = 6  # points on the arc of a round join
+
+def _ring_edges(xs, ys):
+    """Edges of closed rings given as (n_rings, n_vertices) arrays."""
+    return xs, ys, np.roll(xs, -1, axis=1), np.roll(ys, -1, axis=1)
+
+def _concat(parts):
+    return tuple(np.concatenate([p[i].ravel() for p in parts]) for i in range(4))
+
+def _disks(cx, cy, r):
+    sides = int(np.clip(math.ceil(math.pi * r), 8, 48))
+    a = np.linspace(0, 2*math.pi, sides, endpoint=False)
+    return _ring_edges(cx[:, None] + r*np.cos(a), cy[:, None] + r*np.sin(a))
+
+def _segments(x, y, closed):
+    if closed:
+        x = np.append(x, x[0]); y = np.append(y, y[0])
+    px, py, qx, qy = x[:-1], y[:-1], x[1:], y[1:]
+    dx, dy = qx - px, qy - py
+    length = np.hypot(dx, dy)
+    keep = length > 1e-9
+    return px[keep], py[keep], qx[keep], qy[keep], dx[keep]/length[keep], dy[keep]/length[keep]
+
+def fill_edges(x, y):
+    """Edges of a polygon (implicitly closed)."""
+    x = np.asarray(x, dtype=np.float64); y = np.asarray(y, dtype=np.float64)
+    return _ring_edges(x[None], y[None])
+
+def outline_edges(x, y, half_width):
+    """A thin band along a closed polygon: the polygon stroked as a closed line."""
+    x = np.asarray(x, dtype=np.float64); y = np.asarray(y, dtype=np.float64)
+    return stroke_edges(np.append(x, x[0]), np.append(y, y[0]), half_width, "butt")
+
+def stroke_edges(x, y, half_width, capstyle="projecting"):
+    """Outline an open thick polyline: one quad per segment, round joins.
+
+    Each joint gets a pie-slice wedge covering the gap on the outside of the
+    turn; ``round`` caps add a disk at both ends, ``projecting`` caps push
+    the ends out by half the width and ``butt`` caps stop at the end points.
+    """
+    x = np.asarray(x, dtype=np.float64); y = np.asarray(y, dtype=np.float64)
+    px, py, qx, qy, ux, uy = _segments(x, y, closed=False)
+    if len(px) == 0:
+        return tuple(np.empty(0) for _ in range(4))
+    if capstyle == "projecting":
+        px = px.copy(); py = py.copy(); qx = qx.copy(); qy = qy.copy()
+        px[0] -= ux[0]*half_width; py[0] -= uy[0]*half_width
+        qx[-1] += ux[-1]*half_width; qy[-1] += uy[-1]*half_width
+    nx, ny = -uy*half_width, ux*half_width
+    parts = [_ring_edges(np.stack([px - nx, qx - nx, qx + nx, px + nx], axis=1),
+                         np.stack([py - ny, qy - ny, qy + ny, py + ny], axis=1))]
+
+    if len(px) > 1:
+        # turn angle at each joint; the wedge sweeps between the outer normals
+        turn = np.arctan2(ux[:-1]*uy[1:] - uy[:-1]*ux[1:], ux[:-1]*ux[1:] + uy[:-1]*uy[1:])
+        start = np.where(turn > 0, np.arctan2(-ny[:-1], -nx[:-1]), np.arctan2(ny[1:], nx[1:]))
+        phi = start[:, None] + np.abs(turn)[:, None] * np.linspace(0, 1, ARC_POINTS)
+        cx, cy = qx[:-1, None], qy[:-1, None]
+        if capstyle == "projecting":
+            cx, cy = x[1:-1][:len(phi), None], y[1:-1][:len(phi), None]
+        wx = np.concatenate([cx, cx + half_width*np.cos(phi)], axis=1)
+        wy = np.concatenate([cy, cy + half_width*np.sin(phi)], axis=1)
+        parts.append(_ring_edges(wx, wy))
+    if capstyle == "round":
+        parts.append(_disks(np.array([px[0], qx[-1]]), np.array([py[0], qy[-1]]), half_width))
+    return _concat(parts)
+
+
+# ==================== Scan conversion ====================
+def coverage(edges, height, width, subsamples=SUBSAMPLES):
+    """Nonzero-winding coverage of closed edge rings, in [0, 1].
+
+    Returns ``(row0, col0, cov)`` where ``cov`` covers the shape's bounding
+    box clipped to the canvas, or ``None`` if nothing is visible.
+    """
+    x0, y0, x1, y1 = edges
+    ymin = np.minimum(y0, y1); ymax = np.maximum(y0, y1)
+    # sample rows k sit at y = (k + 0.5) / subsamples
+    kmin = np.clip(np.ceil(ymin*subsamples - 0.5), 0, height*subsamples).astype(np.int64)
+    kmax = np.clip(np.ceil(ymax*subsamples - 0.5), 0, height*subsamples).astype(np.int64)
+    count = kmax - kmin
+    live = count > 0
+    if not live.any():
+        return None
+    x0, y0, x1, y1, kmin, count = x0[live], y0[live], x1[live], y1[live], kmin[live], count[live]
+
+    edge = np.repeat(np.arange(len(count)), count)
+    offsets = np.cumsum(count) - count
+    k = kmin[edge] + np.arange(count.sum()) - offsets[edge]
+    sy = (k + 0.5) / subsamples
+    slope = (x1 - x0) / (y1 - y0)
+    xc = x0[edge] + (sy - y0[edge]) * slope[edge]
+    wind = np.where(y1 > y0, 1, -1)[edge]
+
+    # sort by row, then x, with a single float key (much faster than lexsort);
+    # crossings off either side of the canvas are pinned just outside it
+    order = np.argsort(k * (width + 4.0) + np.clip(xc, -1.0, width + 1.0))
+    k, xc, wind = k[order], xc[order], wind[order]
+    # closed rings bring the winding back to zero at the end of every row,
+    # so one running sum over all rows is enough
+    inside = np.cumsum(wind)[:-1] != 0
+    rows = k[:-1][inside]
+    xa = np.clip(xc[:-1][inside], 0, width)
+    xb = np.clip(xc[1:][inside], 0, width)
+    if len(rows) == 0:
+        return None
+
+    row0 = int(rows.min()) // subsamples
+    row1 = int(rows.max()) // subsamples + 1
+    col0 = int(math.floor(xa.min()))
+    col1 = min(int(math.ceil(xb.max())) + 1, width)
+    if col1 <= col0:
+        return None
+    w = col1 - col0 + 2
+    nrows = row1 - row0
+
+    # Span [xa, xb) adds h(xa) - h(xb), where h(x) ramps 0 -> 1 over the pixel
+    # holding x.  That is linear, so the sample rows of a pixel row can share
+    # one difference row and a single running sum.
+    ia = np.floor(xa); fa = xa - ia
+    ib = np.floor(xb); fb = xb - ib
+    ia = ia.astype(np.int64) - col0; ib = ib.astype(np.int64) - col0
+    base = (rows // subsamples - row0) * w
+    idx = np.concatenate([base + ia, base + ia + 1, base + ib, base + ib + 1])
+    val = np.concatenate([1 - fa, fa, fb - 1, -fb]) / subsamples
+    diff = np.bincount(idx, weights=val, minlength=nrows*w).reshape(nrows, w)
+    cov = np.cumsum(diff, axis=1, dtype=np.float32)[:, :col1-col0]
+    return row0, col0, np.clip(cov, 0.0, 1.0, out=cov)
+
+
+# ==================== Canvas ====================
+class Canvas:
+    """Premultiplied float32 RGBA buffer that shapes are composited onto.
+
+    Channels are stored as separate planes, shape ``(4, height, width)``, so
+    blending runs over contiguous rows.  :attr:`dirty` is the (start, stop)
+    range of rows changed since it was last reset to None.
+    """
+
+    def __init__(self, width, height, background=WHITE):
+        self.width, self.height = width, height
+        self.background = to_rgba(background)
+        self.buffer = np.empty((4, height, width), dtype=np.float32)
+        self.clear()
+
+    def clear(self):
+        r, g, b, a = self.background
+        for plane, value in zip(self.buffer, (r*a, g*a, b*a, a)):
+            plane.fill(value)
+        self.dirty = (0, self.height)
+
+    def composite(self, edges, rgba, subsamples=SUBSAMPLES):
+        """Blend ``rgba`` over the canvas wherever ``edges`` cover it."""
+        hit = coverage(edges, self.height, self.width, subsamples)
+        if hit is None:
+            return
+        row0, col0, cov = hit
+        lo, hi = self.dirty or (row0, row0)
+        self.dirty = (min(lo, row0), max(hi, row0 + cov.shape[0]))
+        cov *= np.float32(rgba[3])
+        rows = slice(row0, row0 + cov.shape[0]); cols = slice(col0, col0 + cov.shape[1])
+        src = (rgba[0], rgba[1], rgba[2], 1.0)
+        if np.count_nonzero(cov) < cov.size // 4:
+            # thin shapes (outlines, strokes) touch few pixels of their box
+            yy, xx = np.nonzero(cov)
+            a = cov[yy, xx]
+            for plane, value in zip(self.buffer, src):
+                px = plane[rows, cols][yy, xx]
+                plane[rows, cols][yy, xx] = px + a * (value - px)
+        else:
+            # premultiplied "over": dst * (1 - a) + src * a, in place
+            keep = np.subtract(np.float32(1), cov)
+            scratch = np.empty_like(cov)
+            for plane, value in zip(self.buffer, src):
+                region = plane[rows, cols]
+                region *= keep
+                region += np.multiply(cov, np.float32(value), out=scratch)
+
+    def to_uint8(self, rows=slice(None)):
+        """The canvas (or a slice of its ``rows``) as straight-alpha (height, width, 4) uint8 pixels."""
+        buffer = self.buffer[:, rows]
+        alpha = buffer[3]
+        rgb = np.divide(buffer[:3], alpha, out=np.zeros_like(buffer[:3]), where=alpha > 0)
+        out = np.empty((alpha.shape[0], self.width, 4), dtype=np.uint8)
+        for i, plane in enumerate((*rgb, alpha)):
+            out[..., i] = np.clip(plane, 0, 1) * 255 + 0.5
+        return out
+
+
+# ==================== PNG ====================
+def _chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+def _ihdr(width, height):
+    return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+
+def _phys(dpi):
+    ppm = int(round(dpi / 0.0254))
+    return _chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+def _scanlines(rgba):
+    # every row gets filter type 0 ("None") in front of its pixels
+    n, w, _ = rgba.shape
+    raw = np.empty((n, w*4 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgba.reshape(n, w*4)
+    return raw
+
+class PNGWriter:
+    """Streams RGBA rows into a PNG file.
+
+    Rows are compressed as they arrive and written out in IDAT chunks of
+    about ``chunk_bytes``, so only the rows passed to one :meth:`write` call
+    are ever held in memory.
+    """
+
+    def __init__(self, f, width, height, dpi=None, level=PNG_LEVEL, chunk_bytes=1 << 20):
+        self.f, self.width, self.height = f, width, height
+        self.rows = 0
+        self.chunk_bytes = chunk_bytes
+        self._z = zlib.compressobj(level)
+        self._pending = []
+        self._pending_bytes = 0
+        f.write(_ihdr(width, height))
+        if dpi:
+            f.write(_phys(dpi))
+
+    def write(self, rgba):
+        """Append an (n_rows, width, 4) uint8 block of rows."""
+        self._emit(self._z.compress(_scanlines(rgba)))
+        self.rows += rgba.shape[0]
+
+    def _emit(self, data, final=False):
+        if data:
+            self._pending.append(data)
+            self._pending_bytes += len(data)
+        if self._pending_bytes >= self.chunk_bytes or (final and self._pending):
+            self.f.write(_chunk(b"IDAT", b"".join(self._pending)))
+            self._pending, self._pending_bytes = [], 0
+
+    def close(self):
+        if self.rows != self.height:
+            raise ValueError(f"PNG needs {self.height} rows, got {self.rows}")
+        self._emit(self._z.flush(), final=True)
+        self.f.write(_chunk(b"IEND", b""))
+
+def changed_box(prev, rgba):
+    """(x, y, width, height) of the pixels where ``rgba`` differs from ``prev``.
+
+    The whole frame when there is no ``prev``; a single pixel when nothing
+    changed, since an animation frame cannot be empty.
+    """
+    if prev is None:
+        return 0, 0, rgba.shape[1], rgba.shape[0]
+    diff = (prev != rgba).any(axis=2)
+    rows = np.flatnonzero(diff.any(axis=1))
+    if not rows.size:
+        return 0, 0, 1, 1
+    cols = np.flatnonzero(diff.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)
+
+class APNGWriter:
+    """Streams RGBA frames into an animated PNG.
+
+    Every frame after the first covers only the box where it differs from
+    the frame before, so just the previous frame is kept in memory.  The
+    frame count is patched into ``acTL`` by :meth:`close`, so ``f`` has to be
+    seekable.
+    """
+
+    def __init__(self, f, width, height, fps=12, loops=0, level=PNG_LEVEL):
+        self.f, self.width, self.height = f, width, height
+        self.fps, self.loops, self.level = fps, loops, level
+        self.frames = 0
+        self._seq = 0
+        self._prev = None
+        f.write(_ihdr(width, height))
+        self._actl = f.tell()
+        f.write(_chunk(b"acTL", struct.pack(">II", 0, loops)))
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq - 1
+
+    def write(self, rgba):
+        """Append one (height, width, 4) uint8 frame."""
+        x, y, w, h = changed_box(self._prev, rgba)
+        self._prev = rgba
+        # dispose_op 0 (keep), blend_op 0 (replace the box)
+        self.f.write(_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self._next_seq(), w, h, x, y, 1, self.fps, 0, 0)))
+        data = zlib.compress(_scanlines(rgba[y:y+h, x:x+w]), self.level)
+        if self.frames == 0:
+            self.f.write(_chunk(b"IDAT", data))  # the first frame is also the still image
+        else:
+            self.f.write(_chunk(b"fdAT", struct.pack(">I", self._next_seq()) + data))
+        self.frames += 1
+
+    def close(self):
+        if not self.frames:
+            raise ValueError("an animated PNG needs at least one frame")
+        self.f.write(_chunk(b"IEND", b""))
+        end = self.f.tell()
+        self.f.seek(self._actl)
+        self.f.write(_chunk(b"acTL", struct.pack(">II", self.frames, self.loops)))
+        self.f.seek(end)
+
+def encode_png(rgba, level=PNG_LEVEL, dpi=None):
+    """Encode an (h, w, 4) uint8 array as PNG bytes."""
+    h, w, _ = rgba.shape
+    buf = io.BytesIO()
+    writer = PNGWriter(buf, w, h, dpi, level, chunk_bytes=1 << 62)  # one IDAT chunk
+    writer.write(rgba)
+    writer.close()
+    return buf.getvalue()
+
+
+# ==================== Scene rendering ====================
+def canvas_size(scene, dpi):
+    left, bottom, right, top = AXES_BOX
+    w, h = scene.figsize
+    return max(1, int(round(w*(right-left)*dpi))), max(1, int(round(h*(top-bottom)*dpi)))
+
+def data_limits(scene):
+    """The x/y limits matplotlib would use for the scene."""
+    def auto(values, lim):
+        if lim is not None:
+            return lim
+        if not values:
+            return (0.0, 1.0)
+        lo = min(float(v.min()) for v in values); hi = max(float(v.max()) for v in values)
+        pad = (hi - lo) * MARGIN
+        return (lo - pad, hi + pad)
+    return auto([s.x for s in scene.shapes], scene.xlim), auto([s.y for s in scene.shapes], scene.ylim)
+
+def stacked(shapes):
+    """``shapes`` in matplotlib's drawing order: all patches (zorder 1) before all lines (zorder 2)."""
+    return [s for s in shapes if isinstance(s, Fill)] + [s for s in shapes if not isinstance(s, Fill)]
+
+def draw(scene, canvas, dpi, subsamples=SUBSAMPLES, box=None):
+    """Composite every shape of ``scene`` onto ``canvas``, in drawing order.
+
+    ``box`` is the (left, top, width, height) of the axes in canvas pixels;
+    by default the axes fill the canvas.  A box reaching past the canvas
+    draws just the part of the poster the canvas covers (one strip of a tile).
+    """
+    return draw_shapes(stacked(scene.shapes), canvas, dpi, data_limits(scene), subsamples, box)
+
+def draw_shapes(shapes, canvas, dpi, limits, subsamples=SUBSAMPLES, box=None):
+    """Composite ``shapes`` onto ``canvas`` in the given order, for data ``limits`` ((x0, x1), (y0, y1))."""
+    left, top, width, height = box or (0, 0, canvas.width, canvas.height)
+    (x0, x1), (y0, y1) = limits
+    sx = width / (x1 - x0); sy = height / (y1 - y0)
+    pt = dpi / 72.0
+    for shape in shapes:
+        px = left + (np.asarray(shape.x, dtype=np.float64) - x0) * sx
+        py = top + (y1 - np.asarray(shape.y, dtype=np.float64)) * sy
+        if isinstance(shape, Fill):
+            face = to_rgba(shape.color, shape.alpha)
+            edge = face if shape.edgecolor is None else to_rgba(shape.edgecolor, shape.alpha)
+            canvas.composite(fill_edges(px, py), face, subsamples)
+            if edge[3] > 0:
+                canvas.composite(outline_edges(px, py, PATCH_LINEWIDTH*pt/2), edge, subsamples)
+        else:
+            canvas.composite(stroke_edges(px, py, shape.linewidth*pt/2, shape.capstyle or "projecting"),
+                             to_rgba(shape.color, shape.alpha), subsamples)
+    return canvas
+
+def render_rgba(scene, dpi=100, subsamples=SUBSAMPLES):
+    """Render a scene to an (h, w, 4) uint8 array."""
+    width, height = canvas_size(scene, dpi)
+    return draw(scene, Canvas(width, height), dpi, subsamples).to_uint8()
+
+def scene_png(scene, dpi=100, subsamples=SUBSAMPLES, level=PNG_LEVEL):
+    """Render a scene straight to PNG bytes without touching matplotlib."""
+    with stage("rasterize"):
+        rgba = render_rgba(scene, dpi, subsamples)
+    with stage("encode"):
+        return encode_png(rgba, level, dpi)
+
+
+# ==================== Incremental rendering ====================
+LIVE_BAND_ROWS = 32  # rows per separately compressed band of a LiveRaster's PNG
+
+def _adler32_combine(a, b, length):
+    """adler32 of ``x + y`` from ``a = adler32(x)``, ``b = adler32(y)`` and ``length = len(y)``."""
+    s1 = ((a & 0xFFFF) + (b & 0xFFFF) - 1) % 65521
+    s2 = ((a >> 16) + (b >> 16) + length * ((a & 0xFFFF) - 1)) % 65521
+    return s2 << 16 | s1
+
+class LiveRaster:
+    """A growing scene and its canvas, kept in step as shapes are appended.
+
+    :meth:`png` composites only the shapes appended to ``scene.shapes`` since
+    the last call onto the kept canvas, and recompresses only the bands of
+    ``LIVE_BAND_ROWS`` rows they touched: each band is its own deflate
+    segment, ended with a full flush so the segments join into one PNG
+    stream, and only the segments and their adler32 are kept, not the
+    scanlines.  Adding a shape therefore costs the same however many are
+    already drawn.  The canvas is redrawn from scratch only when new shapes
+    cannot just go on top: a fill after a stroke (fills are drawn below
+    lines), new data limits on an autoscaled scene, or after :meth:`release`.
+    The pixels are those :func:`scene_png` draws for the whole scene.
+    """
+
+    def __init__(self, scene, dpi=100, subsamples=SUBSAMPLES, level=PNG_LEVEL):
+        self.scene, self.dpi, self.subsamples, self.level = scene, dpi, subsamples, level
+        self.canvas = Canvas(*canvas_size(scene, dpi))
+        self.drawn = 0  # shapes of scene.shapes already on the canvas
+        self._limits = None
+        self._stroked = False
+        self._bands = [None] * -(-self.canvas.height // LIVE_BAND_ROWS)  # (adler32, length, deflated) per band
+        self._png = None
+
+    @property
+    def nbytes(self):
+        """Bytes held: the float canvas, the compressed bands and the PNG."""
+        held = self.canvas.buffer.nbytes if self.canvas is not None else 0
+        return held + sum(len(b[2]) for b in self._bands if b) + len(self._png or b"")
+
+    def release(self):
+        """Drop the canvas and bands (the last PNG stays); the next change redraws them."""
+        if self._png is not None:
+            self.canvas = None
+            self._bands = [None] * len(self._bands)
+
+    def _current_limits(self):
+        if self.scene.xlim is not None and self.scene.ylim is not None:
+            return self.scene.xlim, self.scene.ylim
+        return data_limits(self.scene)
+
+    def update(self):
+        """Composite the shapes appended since the last update; returns self."""
+        if self.drawn == len(self.scene.shapes):
+            return self
+        new = self.scene.shapes[self.drawn:]
+        limits = self._current_limits()
+        released = self.canvas is None
+        if released:
+            self.canvas = Canvas(*canvas_size(self.scene, self.dpi))
+        if released or self.drawn > len(self.scene.shapes) or limits != self._limits \
+                or (self._stroked and any(isinstance(s, Fill) for s in new)):
+            self.canvas.clear()
+            self._stroked = False
+            new = stacked(self.scene.shapes)
+        with stage("rasterize"):
+            draw_shapes(new, self.canvas, self.dpi, limits, self.subsamples)
+        self._limits = limits
+        self._stroked = self._stroked or any(not isinstance(s, Fill) for s in new)
+        self.drawn = len(self.scene.shapes)
+        return self
+
+    def png(self):
+        """PNG bytes of the scene as it is now."""
+        self.update()
+        if self.canvas is not None and (self._png is None or self.canvas.dirty is not None):
+            with stage("encode"):
+                lo, hi = self.canvas.dirty or (0, self.canvas.height)
+                self.canvas.dirty = None
+                for band in range(lo // LIVE_BAND_ROWS, -(-hi // LIVE_BAND_ROWS)):
+                    rows = slice(band * LIVE_BAND_ROWS, (band + 1) * LIVE_BAND_ROWS)
+                    raw = _scanlines(self.canvas.to_uint8(rows))
+                    z = zlib.compressobj(self.level, zlib.DEFLATED, -15)  # raw deflate, no header
+                    self._bands[band] = (zlib.adler32(raw), raw.nbytes, z.compress(raw) + z.flush(zlib.Z_FULL_FLUSH))
+                adler = 1
+                for band_adler, length, _ in self._bands:
+                    adler = _adler32_combine(adler, band_adler, length)
+                # zlib header, the bands, an empty final block, the checksum of all scanlines
+                stream = b"".join([b"\x78\x01", *(deflated for _, _, deflated in self._bands),
+                                   b"\x03\x00", struct.pack(">I", adler)])
+                self._png = b"".join([_ihdr(self.canvas.width, self.canvas.height), _phys(self.dpi),
+                                      _chunk(b"IDAT", stream), _chunk(b"IEND", b"")])
+        return self._png
@@ -0,0 +1,141 @@
+"""Process-wide render cache for the poster pages.
+
+Streamlit re-executes ``app.py`` from the top on every rerun, so anything kept
+at module level there is thrown away.  This module is imported once per
+process, which lets finished posters survive reruns and be shared between
+sessions that ask for the same seed and parameters.
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Byte budget for all cached entries (preview + PNG bytes), overridable per deployment.
+DEFAULT_MAX_BYTES = int(os.environ.get("POSTER_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Slider floats are rounded to this step before they become part of a key,
+# so 0.15 and 0.15000000000000002 land on the same entry.
+QUANTUM = 1e-4
+
+
+def quantize(value, step=QUANTUM):
+    """Round floats (and tuples of floats) to ``step`` so they key reliably."""
+    if isinstance(value, (tuple, list)):
+        return tuple(quantize(v, step) for v in value)
+    if isinstance(value, (float, np.floating)):
+        return round(round(float(value) / step) * step, 10)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def palette_digest(palette):
+    """Hash a palette by content and shape (list of RGB tuples or an array)."""
+    arr = np.ascontiguousarray(np.asarray(palette, dtype=np.float64))
+    h = hashlib.sha1(repr(arr.shape).encode())
+    h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def make_key(page, seed, params=None, palette=None):
+    """Build a hashable cache key from page name, seed, sliders and palette."""
+    items = tuple(sorted((k, quantize(v)) for k, v in (params or {}).items()))
+    digest = palette_digest(palette) if palette is not None else None
+    return (page, int(seed), items, digest)
+
+
+def sizeof(value):
+    """Approximate the memory held by a cache entry."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(v) for v in value)
+    if hasattr(value, "__dict__"):
+        return sizeof(vars(value))
+    return sys.getsizeof(value)
+
+
+class RenderCache:
+    """Thread-safe LRU cache bounded by the total size of its entries."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def peek(self, key):
+        """Look up ``key`` without touching LRU order or hit/miss counts."""
+        with self._lock:
+            item = self._entries.get(key)
+            return None if item is None else item[0]
+
+    def put(self, key, value):
+        nbytes = sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return value  # never cache something that would evict everything
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            self._evict()
+        return value
+
+    def get_or_render(self, key, render):
+        """Return the cached value for ``key`` or compute it with ``render()``."""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, render())
+        return value
+
+    def _evict(self, limit=None):
+        limit = self.max_bytes if limit is None else limit
+        while self._bytes > limit and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+
+    def evict_to(self, nbytes):
+        """Drop least recently used entries until at most ``nbytes`` remain."""
+        with self._lock:
+            self._evict(nbytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+RENDER_CACHE = RenderCache()
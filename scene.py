@@ -0,0 +1,174 @@
+"""Poster scenes: the shapes of a poster, kept apart from how they are drawn.
+
+A page builds a :class:`Scene` once per seed/parameter set.  The same scene is
+then drawn for the on-screen preview and, only when somebody asks for it, for
+the print-resolution PNG, so both always show the same poster.  Building
+scenes needs only NumPy; matplotlib is imported when a scene is drawn.
+"""
+from dataclasses import dataclass, field, replace
+from io import BytesIO
+
+import numpy as np
+
+from figures import FIGURES
+from timings import stage
+
+
+@dataclass
+class Fill:
+    """A filled polygon, as drawn by ``ax.fill``."""
+    x: np.ndarray
+    y: np.ndarray
+    color: object
+    alpha: float = None
+    edgecolor: object = None
+
+
+@dataclass
+class Stroke:
+    """A polyline, as drawn by ``ax.plot``."""
+    x: np.ndarray
+    y: np.ndarray
+    color: object
+    linewidth: float = 1.5
+    alpha: float = None
+    capstyle: str = None
+
+
+@dataclass
+class Text:
+    """A label placed in axes coordinates (0-1)."""
+    x: float
+    y: float
+    s: str
+    fontsize: float = 10
+    weight: str = None
+
+
+@dataclass
+class Scene:
+    figsize: tuple
+    facecolor: tuple = None
+    xlim: tuple = None  # None -> matplotlib autoscale, as the original pages did
+    ylim: tuple = None
+    title: str = None
+    shapes: list = field(default_factory=list)
+    texts: list = field(default_factory=list)
+
+    def fill(self, x, y, color, alpha=None, edgecolor=None):
+        self.shapes.append(Fill(np.asarray(x), np.asarray(y), color, alpha, edgecolor))
+
+    def stroke(self, x, y, color, linewidth=1.5, alpha=None, capstyle=None):
+        self.shapes.append(Stroke(np.asarray(x), np.asarray(y), color, linewidth, alpha, capstyle))
+
+    def text(self, x, y, s, fontsize=10, weight=None):
+        self.texts.append(Text(x, y, s, fontsize, weight))
+
+
+def decimate(scene, step):
+    """A copy of ``scene`` keeping every ``step``-th vertex of each shape.
+
+    Strokes keep their last vertex so lines still reach their end points;
+    fills close on their own.  Used for quick, coarse previews.
+    """
+    shapes = []
+    for s in scene.shapes:
+        x, y = s.x[::step], s.y[::step]
+        if isinstance(s, Stroke) and (len(s.x) - 1) % step:
+            x, y = np.append(x, s.x[-1]), np.append(y, s.y[-1])
+        shapes.append(replace(s, x=x, y=y))
+    return replace(scene, shapes=shapes, texts=list(scene.texts))
+
+
+# ==================== matplotlib renderer ====================
+def draw_scene(scene, collections=True):
+    """Draw a scene onto a new pyplot figure and return the figure (the caller closes it)."""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=scene.figsize)
+    draw_on(ax, scene, collections)
+    return fig
+
+
+def draw_on(ax, scene, collections=True):
+    """Draw a scene onto an existing, empty axes.
+
+    With ``collections`` (the default) all fills go into one PolyCollection and
+    all strokes into one LineCollection per cap style, so draw time no longer
+    grows with the number of matplotlib artists.  The stacking matches the
+    one-artist-per-shape mode: fills (zorder 1) in order, then strokes (zorder 2).
+    """
+    ax.axis("off")
+    if scene.facecolor is not None:
+        ax.set_facecolor(scene.facecolor)
+    if collections:
+        _draw_collections(ax, scene.shapes)
+    else:
+        _draw_artists(ax, scene.shapes)
+    if scene.xlim is not None:
+        ax.set_xlim(*scene.xlim)
+    if scene.ylim is not None:
+        ax.set_ylim(*scene.ylim)
+    for t in scene.texts:
+        ax.text(t.x, t.y, t.s, fontsize=t.fontsize, weight=t.weight, transform=ax.transAxes)
+    if scene.title is not None:
+        ax.set_title(scene.title)
+
+
+def _draw_artists(ax, shapes):
+    for shape in shapes:
+        if isinstance(shape, Fill):
+            kw = {} if shape.edgecolor is None else {"edgecolor": shape.edgecolor}
+            ax.fill(shape.x, shape.y, color=shape.color, alpha=shape.alpha, **kw)
+        else:
+            kw = {} if shape.capstyle is None else {"solid_capstyle": shape.capstyle}
+            ax.plot(shape.x, shape.y, color=shape.color, linewidth=shape.linewidth, alpha=shape.alpha, **kw)
+
+
+def _draw_collections(ax, shapes):
+    import matplotlib as mpl
+    from matplotlib.collections import LineCollection, PolyCollection
+    from matplotlib.colors import to_rgba, to_rgba_array
+
+    fills = [s for s in shapes if isinstance(s, Fill)]
+    if fills:
+        faces = to_rgba_array([to_rgba(f.color, f.alpha) for f in fills])
+        # ax.fill(color=...) strokes the outline in the fill color unless told otherwise
+        edges = to_rgba_array([faces[i] if f.edgecolor is None else to_rgba(f.edgecolor, f.alpha)
+                               for i, f in enumerate(fills)])
+        polys = [np.column_stack([f.x, f.y]) for f in fills]
+        ax.add_collection(PolyCollection(polys, facecolors=faces, edgecolors=edges,
+                                         linewidths=mpl.rcParams["patch.linewidth"],
+                                         joinstyle="miter", capstyle="butt", zorder=1))
+
+    strokes = [s for s in shapes if isinstance(s, Stroke)]
+    for cap in dict.fromkeys(s.capstyle for s in strokes):
+        group = [s for s in strokes if s.capstyle == cap]
+        lines = [np.column_stack([s.x, s.y]) for s in group]
+        colors = to_rgba_array([to_rgba(s.color, s.alpha) for s in group])
+        ax.add_collection(LineCollection(lines, colors=colors, linewidths=[s.linewidth for s in group],
+                                         capstyle=cap or mpl.rcParams["lines.solid_capstyle"],
+                                         joinstyle=mpl.rcParams["lines.solid_joinstyle"], zorder=2))
+    if shapes:
+        ax.autoscale_view()
+
+
+def fig_to_bytes(fig, dpi=300):
+    """Save a figure as PNG into a rewound BytesIO, trimmed to its content."""
+    buf = BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=dpi)
+    buf.seek(0)
+    return buf
+
+def scene_png(scene, dpi=300, collections=True, bbox_inches="tight"):
+    """Render a scene straight to PNG bytes on a figure from the figure manager.
+
+    Pass ``bbox_inches=None`` to keep the full figure canvas, as a plain
+    ``plt.savefig`` does.
+    """
+    with FIGURES.subplots(scene.figsize) as (fig, ax):
+        with stage("draw"):
+            draw_on(ax, scene, collections)
+        buf = BytesIO()
+        with stage("savefig"):
+            fig.savefig(buf, format="png", bbox_inches=bbox_inches, dpi=dpi)
+    return buf.getvalue()
@@ -0,0 +1,407 @@
+"""Local HTTP render API: posters as PNG or SVG for signage and print systems.
+
+A small asyncio server built on the standard library only:
+
+    python server.py --port 8600 --workers 4
+
+    GET  /pages                                   builders and their parameters
+    GET  /render/week5.png?seed=3&wobble=0.2      one poster (dpi=, backend=numpy|matplotlib)
+    GET  /render/final.svg?seed=7&shape=Flower
+    POST /batch   {"items": [{"page": "week2", "seed": 1, "format": "png"}, ...]}
+    GET  /stats                                   queue, workers and cache counters
+
+Renders run in a pool of ``workers`` processes, fed from a queue of at most
+``queue`` jobs.  When the queue is full a request is refused at once with
+``503`` and ``Retry-After`` instead of piling up.  Identical requests in
+flight share one render, finished posters are kept in :data:`RENDER_CACHE`,
+and the workers read and fill the shared :data:`DISK_CACHE`.  A batch comes
+back as one ZIP archive with a ``manifest.json``.
+"""
+import argparse
+import asyncio
+import inspect
+import io
+import json
+import logging
+import os
+import signal
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from urllib.parse import parse_qsl, urlsplit
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from posters import BUILDERS, WEEK3_PRESETS
+from render_cache import RENDER_CACHE, make_key
+
+log = logging.getLogger("server")
+
+WORKERS = int(os.environ.get("POSTER_API_WORKERS", os.cpu_count() or 1))
+QUEUE_SIZE = int(os.environ.get("POSTER_API_QUEUE", 64))  # queued renders before requests get 503
+MAX_BATCH = int(os.environ.get("POSTER_API_MAX_BATCH", 64))
+MAX_DPI = int(os.environ.get("POSTER_API_MAX_DPI", 600))
+DPI = 150
+MAX_BODY = 1024 * 1024
+HEADER_TIMEOUT = 30.0  # seconds to receive a request's headers and body
+RETRY_AFTER = 1  # seconds suggested to clients refused for a full queue
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+BACKENDS = ("matplotlib", "numpy")
+PALETTE_MODES = ("pastel", "vivid", "mono", "random", "csv")
+# Accepted values of every builder parameter: the ranges (inclusive) or choices
+# of the matching sidebar widgets in app.py.
+LIMITS = {
+    "week2": {"n_layers": (1, 20), "wobble_range": (0.0, 1.0)},
+    "week3": {"preset": tuple(WEEK3_PRESETS)},
+    "week4_flowers": {"layers": (1, 12), "wobble": (0.0, 0.1), "palette_index": (0, 2), "n_flowers": (1, 12)},
+    "week4_spheres": {"layers": (1, 10), "shadow_offset": (0.0, 0.08), "palette_index": (0, 1), "n_spheres": (1, 20)},
+    "week5": {"mode": PALETTE_MODES, "k": (3, 12), "n_layers": (3, 20), "wobble": (0.01, 1.0)},
+    "final": {"shape": ("Blob", "Flower", "Sphere"), "palette_mode": PALETTE_MODES, "n_layers": (3, 20), "wobble": (0.01, 0.5)},
+}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status, self.headers = status, list(headers)
+
+class Busy(HTTPError):
+    """The render queue has no room for the request."""
+
+    def __init__(self):
+        super().__init__(503, "render queue is full", [("Retry-After", str(RETRY_AFTER))])
+
+
+# ==================== Requests ====================
+def builder_params(page):
+    """{name: default} of the arguments ``page`` accepts besides the seed."""
+    return {name: p.default for name, p in inspect.signature(BUILDERS[page]).parameters.items()
+            if name not in ("seed", "csv_override")}
+
+def _convert(value, default):
+    if isinstance(default, tuple):
+        if isinstance(value, str):
+            value = value.split(",")
+        if not isinstance(value, (list, tuple)) or len(value) != len(default):
+            raise ValueError
+        return tuple(float(v) for v in value)
+    if isinstance(default, float):
+        return float(value)
+    if isinstance(default, int):
+        if isinstance(value, (bool, float)):
+            raise ValueError  # 3.5 must not quietly become 3
+        return int(value)  # strings like "3.5" raise too
+    return str(value)
+
+def _check(page, name, value):
+    limit = LIMITS[page][name]
+    if isinstance(limit[0], str):
+        if value not in limit:
+            raise HTTPError(400, f"{name} must be one of {', '.join(limit)}")
+        return
+    lo, hi = limit
+    if not all(lo <= v <= hi for v in (value if isinstance(value, tuple) else (value,))):
+        raise HTTPError(400, f"{name} must be between {lo} and {hi}")
+
+def parse_spec(page, fmt, fields):
+    """Validate one render request (``fields``: seed, dpi, backend and builder parameters).
+
+    Builder parameters must lie within :data:`LIMITS`.  Returns ``(key, job)``.
+    """
+    params = dict(fields)
+    seed, dpi, backend = params.pop("seed", None), params.pop("dpi", DPI), params.pop("backend", "matplotlib")
+    if page not in BUILDERS:
+        raise HTTPError(404, f"unknown page {page!r}; expected one of {', '.join(BUILDERS)}")
+    if fmt not in FORMATS:
+        raise HTTPError(400, f"unknown format {fmt!r}; expected png or svg")
+    if backend not in BACKENDS:
+        raise HTTPError(400, f"unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    try:
+        seed, dpi = int(seed), int(dpi)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "seed and dpi must be integers") from None
+    if not 1 <= dpi <= MAX_DPI:
+        raise HTTPError(400, f"dpi must be between 1 and {MAX_DPI}")
+    accepted = builder_params(page)
+    kwargs = {}
+    for name, value in params.items():
+        if name not in accepted:
+            raise HTTPError(400, f"{page} has no parameter {name!r} (choose from {', '.join(accepted)})")
+        try:
+            kwargs[name] = _convert(value, accepted[name])
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"bad value for {name}: {value!r}") from None
+        _check(page, name, kwargs[name])
+    palette = None
+    if "csv" in (kwargs.get("mode"), kwargs.get("palette_mode")):
+        # key and render the palette as it is now, so an edited palette.csv is never served stale
+        from palettes import load_csv_palette
+        palette = load_csv_palette()
+    key = make_key(page, seed, {**kwargs, "renderer": backend}, palette)
+    key += ("png", dpi) if fmt == "png" else ("svg",)
+    if palette is not None:
+        if not len(palette):
+            raise HTTPError(400, "palette.csv has no colors; pick another palette mode")
+        kwargs["csv_override"] = palette
+    return key, (page, seed, kwargs, fmt, dpi, backend)
+
+
+# ==================== Worker ====================
+def render_job(key, job):
+    """Render one poster to bytes; runs in a pool worker."""
+    from disk_cache import DISK_CACHE
+
+    page, seed, kwargs, fmt, dpi, backend = job
+    def render():
+        import engine
+        scene = BUILDERS[page](seed, **kwargs)
+        return engine.scene_svg(scene) if fmt == "svg" else engine.render_png(scene, dpi=dpi, backend=backend)
+    return DISK_CACHE.get_or_render(key, render)
+
+
+class RenderService:
+    """Bounded render queue in front of a process pool, with request coalescing."""
+
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE):
+        self.workers = workers
+        self.queue = asyncio.Queue(queue_size)
+        self.inflight = {}  # key -> Future shared by identical requests
+        self.rendered = self.coalesced = self.refused = self.failed = 0
+        # workers must not inherit the listening socket or the event loop
+        method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+        self._pool = ProcessPoolExecutor(workers, mp_context=get_context(method))
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pool.shutdown(cancel_futures=True)
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, job, future = await self.queue.get()
+            try:
+                data = await loop.run_in_executor(self._pool, render_job, key, job)
+            except Exception as exc:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                self.rendered += 1
+                RENDER_CACHE.put(key, data)
+                if not future.done():
+                    future.set_result(data)
+            finally:
+                self.queue.task_done()
+
+    def pending(self, keys):
+        """How many of ``keys`` would need a new queue slot."""
+        return sum(1 for key in set(keys) if key not in self.inflight and RENDER_CACHE.peek(key) is None)
+
+    def submit(self, key, job):
+        """A future for the bytes of ``key``: cached, shared with an identical request, or queued.
+
+        Raises :class:`Busy` when a new render would not fit in the queue.
+        """
+        future = asyncio.get_running_loop().create_future()
+        data = RENDER_CACHE.get(key)
+        if data is not None:
+            future.set_result(data)
+            return future
+        shared = self.inflight.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            return shared
+        try:
+            self.queue.put_nowait((key, job, future))
+        except asyncio.QueueFull:
+            self.refused += 1
+            raise Busy() from None
+        self.inflight[key] = future
+        future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return future
+
+    async def render(self, key, job):
+        # shielded: a client hanging up must not cancel a render others are waiting on.
+        # Requests are validated by parse_spec, so anything a worker raises is a server error.
+        return await asyncio.shield(self.submit(key, job))
+
+    def stats(self):
+        return {"workers": self.workers, "queued": self.queue.qsize(), "queue_size": self.queue.maxsize,
+                "inflight": len(self.inflight), "rendered": self.rendered, "coalesced": self.coalesced,
+                "refused": self.refused, "failed": self.failed, "memory_cache": RENDER_CACHE.stats()}
+
+
+# ==================== Endpoints ====================
+def _json(obj, status=200):
+    return status, "application/json", json.dumps(obj).encode(), []
+
+async def render_one(service, page, query):
+    name, _, fmt = page.rpartition(".")
+    key, job = parse_spec(name or fmt, fmt if name else "png", query)
+    return 200, FORMATS[job[3]], await service.render(key, job), []
+
+async def render_batch(service, body):
+    try:
+        request = json.loads(body or b"null")
+    except json.JSONDecodeError:
+        raise HTTPError(400, "batch body must be JSON") from None
+    items = request.get("items") if isinstance(request, dict) else request
+    if not isinstance(items, list) or not items or not all(isinstance(i, dict) for i in items):
+        raise HTTPError(400, 'expected {"items": [{"page": ..., "seed": ...}, ...]}')
+    if len(items) > MAX_BATCH:
+        raise HTTPError(413, f"at most {MAX_BATCH} posters per batch")
+    specs = []
+    for item in items:
+        item = dict(item)
+        params = item.pop("params", {})
+        if not isinstance(params, dict):
+            raise HTTPError(400, "params must be an object")
+        specs.append(parse_spec(item.pop("page", None), item.pop("format", "png"), {**item, **params}))
+    # admit the whole batch or none of it
+    if service.pending(key for key, _ in specs) > service.queue.maxsize - service.queue.qsize():
+        service.refused += 1
+        raise Busy()
+    futures = [service.submit(key, job) for key, job in specs]
+    results = await asyncio.gather(*(asyncio.shield(f) for f in futures), return_exceptions=True)
+
+    buf = io.BytesIO()
+    manifest = []
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:  # PNG is compressed already
+        for i, ((_, (page, seed, kwargs, fmt, dpi, backend)), data) in enumerate(zip(specs, results)):
+            params = {k: v for k, v in kwargs.items() if k != "csv_override"}
+            entry = {"page": page, "seed": seed, "format": fmt, "params": params}
+            if isinstance(data, BaseException):
+                log.error("batch item %d (%s, seed %s) failed", i, page, seed, exc_info=data)
+                entry["error"] = "render failed"
+            else:
+                entry["file"] = f"{i:03d}_{page}_seed{seed}.{fmt}"
+                zf.writestr(entry["file"], data)
+            manifest.append(entry)
+        zf.writestr("manifest.json", json.dumps(manifest, indent=1))
+    return 200, "application/zip", buf.getvalue(), [("Content-Disposition", 'attachment; filename="posters.zip"')]
+
+async def route(service, method, target, body):
+    url = urlsplit(target)
+    query = dict(parse_qsl(url.query))
+    parts = [p for p in url.path.split("/") if p]
+    if parts == ["batch"]:
+        if method != "POST":
+            raise HTTPError(405, "use POST for /batch")
+        return await render_batch(service, body)
+    if method != "GET":
+        raise HTTPError(405, f"{method} not allowed")
+    if len(parts) == 2 and parts[0] == "render":
+        return await render_one(service, parts[1], query)
+    if parts == ["pages"]:
+        return _json({page: {k: list(v) if isinstance(v, tuple) else v for k, v in builder_params(page).items()}
+                      for page in BUILDERS})
+    if parts == ["stats"]:
+        return _json(service.stats())
+    if parts in ([], ["health"]):
+        return _json({"ok": True})
+    raise HTTPError(404, f"no such endpoint: {url.path}")
+
+
+# ==================== HTTP ====================
+async def read_request(reader):
+    """(method, target, headers, body) of the next request, or None at end of stream."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    headers[":version"] = version
+    return method.upper(), target, headers, body
+
+def write_response(writer, status, content_type, body, headers=(), keep_alive=True):
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{k}: {v}" for k, v in headers]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+async def handle(service, reader, writer):
+    try:
+        while True:
+            keep_alive, request = False, None
+            try:
+                request = await asyncio.wait_for(read_request(reader), HEADER_TIMEOUT)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close" and headers[":version"] == "HTTP/1.1"
+                response = await route(service, method, target, body)
+            except asyncio.TimeoutError:
+                response = _json({"error": "request timed out"}, 408)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except HTTPError as exc:
+                response = (*_json({"error": str(exc)}, exc.status)[:3], exc.headers)
+            except Exception as exc:
+                log.exception("request failed: %s", request[1] if request else "?")
+                # details stay in the log: internal messages are not for clients
+                response = _json({"error": "server is busy"}, 503) if type(exc).__name__ == "Overloaded" \
+                    else _json({"error": "internal server error"}, 500)
+            write_response(writer, *response, keep_alive=keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8600, workers=WORKERS, queue_size=QUEUE_SIZE):
+    """Run the API until SIGINT or SIGTERM."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    service = RenderService(workers, queue_size)
+    service.start()
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    log.info("serving on http://%s:%d with %d workers", host, port, workers)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        await service.close()
+    log.info("stopped")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve poster renders over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="render processes (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help="queued renders before requests are refused")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(serve(args.host, args.port, args.workers, args.queue))
+
+
+if __name__ == "__main__":
+    main()
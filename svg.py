@@ -0,0 +1,123 @@
+"""Vector export: poster scenes written straight to SVG, without matplotlib.
+
+The page is laid out the way matplotlib lays out the full figure (``savefig``
+with ``bbox_inches=None``): ``figsize`` in points, shapes in the default
+subplot box and clipped to it, data limits as in the other backends
+(:func:`raster.data_limits`), fills before strokes, the 1 pt outline that
+``ax.fill`` draws, text labels and the title.  The axes are off, so the
+scene's facecolor is not painted, as in matplotlib.
+
+To keep files small, coordinates are integers in 1/``SCALE`` pt, paths are
+written with relative moves, and every distinct paint (colors, opacity,
+width, cap) is one shared CSS class.  :func:`iter_svg` yields the document
+in chunks, so it can be streamed to a file or an HTTP response.
+"""
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from raster import AXES_BOX, PATCH_LINEWIDTH, data_limits, to_rgba
+from scene import Fill
+from timings import stage
+
+SCALE = 10  # user units per point: coordinates are rounded to 0.1 pt
+CHUNK = 64 * 1024  # characters per chunk yielded by iter_svg
+FONT = "DejaVu Sans, Bitstream Vera Sans, sans-serif"  # matplotlib's default font
+TITLE_SIZE = 12.0  # rcParams["axes.titlesize"] ("large") in points
+TITLE_PAD = 6.0  # rcParams["axes.titlepad"] in points
+LINE_CAPS = {None: "square", "projecting": "square", "butt": "butt", "round": "round"}  # default: rcParams["lines.solid_capstyle"]
+
+
+def _num(v):
+    return f"{v:.4g}".lstrip("0") if 0 < v < 1 else f"{v:.4g}"
+
+def _paint(rgba, prop):
+    """CSS for one color, e.g. ``fill:#ffb3ba;fill-opacity:.6``."""
+    css = f"{prop}:#{''.join(f'{int(round(c * 255)):02x}' for c in rgba[:3])}"
+    return css if rgba[3] >= 1 else f"{css};{prop}-opacity:{_num(rgba[3])}"
+
+def _path(px, py, closed):
+    xs = np.round(np.asarray(px) * SCALE).astype(np.int64)
+    ys = np.round(np.asarray(py) * SCALE).astype(np.int64)
+    d = f"M{xs[0]} {ys[0]}"
+    if len(xs) > 1:
+        steps = np.column_stack([np.diff(xs), np.diff(ys)]).ravel()
+        d += "l" + " ".join(map(str, steps.tolist())).replace(" -", "-")
+    return d + "z" if closed else d
+
+
+def _layout(scene):
+    """Page size in points and the data -> page transform of the axes box."""
+    w, h = scene.figsize[0] * 72.0, scene.figsize[1] * 72.0
+    left, bottom, right, top = AXES_BOX
+    (x0, x1), (y0, y1) = data_limits(scene)
+    sx = (right - left) * w / (x1 - x0)
+    sy = (top - bottom) * h / (y1 - y0)
+    def to_page(x, y):
+        return left*w + (np.asarray(x, dtype=np.float64) - x0) * sx, (1 - bottom)*h - (np.asarray(y, dtype=np.float64) - y0) * sy
+    return w, h, to_page
+
+def _drawing_order(shapes):
+    # the matplotlib renderer: one PolyCollection, then a LineCollection per cap style
+    fills = [s for s in shapes if isinstance(s, Fill)]
+    strokes = [s for s in shapes if not isinstance(s, Fill)]
+    return fills + [s for cap in dict.fromkeys(s.capstyle for s in strokes) for s in strokes if s.capstyle == cap]
+
+def _style(shape):
+    if isinstance(shape, Fill):
+        face = to_rgba(shape.color, shape.alpha)
+        edge = face if shape.edgecolor is None else to_rgba(shape.edgecolor, shape.alpha)
+        if edge[3] <= 0:
+            return _paint(face, "fill")
+        return f"{_paint(face, 'fill')};{_paint(edge, 'stroke')};stroke-width:{_num(PATCH_LINEWIDTH * SCALE)}"
+    return (f"fill:none;{_paint(to_rgba(shape.color, shape.alpha), 'stroke')};stroke-width:{_num(shape.linewidth * SCALE)};"
+            f"stroke-linecap:{LINE_CAPS[shape.capstyle]};stroke-linejoin:round")
+
+
+def iter_svg(scene):
+    """Yield the SVG document of ``scene`` as text chunks."""
+    w, h, to_page = _layout(scene)
+    left, bottom, right, top = AXES_BOX
+    shapes = _drawing_order(scene.shapes)
+    classes = {}
+    styles = [classes.setdefault(_style(s), f"p{len(classes)}") for s in shapes]
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(w)}pt" height="{_num(h)}pt" '
+           f'viewBox="0 0 {round(w * SCALE)} {round(h * SCALE)}">\n<style>\n',
+           *(f".{name}{{{css}}}\n" for css, name in classes.items()),
+           f"text{{font-family:{FONT};fill:#000}}\n</style>\n",
+           '<rect width="100%" height="100%" fill="#fff"/>\n',
+           f'<clipPath id="axes"><rect x="{round(left*w*SCALE)}" y="{round((1-top)*h*SCALE)}" '
+           f'width="{round((right-left)*w*SCALE)}" height="{round((top-bottom)*h*SCALE)}"/></clipPath>\n'
+           '<g clip-path="url(#axes)">\n']
+    size = sum(map(len, out))
+    for shape, name in zip(shapes, styles):
+        px, py = to_page(shape.x, shape.y)
+        line = f'<path class="{name}" d="{_path(px, py, isinstance(shape, Fill))}"/>\n'
+        out.append(line)
+        size += len(line)
+        if size >= CHUNK:
+            yield "".join(out)
+            out, size = [], 0
+    out.append("</g>\n")
+
+    for t in scene.texts:  # axes coordinates, left / baseline aligned
+        weight = f' font-weight="{t.weight}"' if t.weight else ""
+        out.append(f'<text x="{round((left + t.x*(right-left)) * w * SCALE)}" '
+                   f'y="{round((1 - bottom - t.y*(top-bottom)) * h * SCALE)}" '
+                   f'font-size="{_num(t.fontsize * SCALE)}"{weight}>{escape(t.s)}</text>\n')
+    if scene.title is not None:  # centered over the axes
+        out.append(f'<text x="{round((left+right)/2 * w * SCALE)}" y="{round(((1-top)*h - TITLE_PAD) * SCALE)}" '
+                   f'font-size="{_num(TITLE_SIZE * SCALE)}" text-anchor="middle">{escape(scene.title)}</text>\n')
+    out.append("</svg>\n")
+    yield "".join(out)
+
+def write_svg(scene, f):
+    """Stream the SVG of ``scene`` into the binary file ``f``."""
+    for chunk in iter_svg(scene):
+        f.write(chunk.encode())
+
+def scene_svg(scene):
+    """The SVG of ``scene`` as bytes."""
+    with stage("svg"):
+        return "".join(iter_svg(scene)).encode()
@@ -0,0 +1,58 @@
+"""PaletteIndex answers must match a brute-force scan over every color."""
+import random
+
+import numpy as np
+import pytest
+
+from palette_index import PaletteIndex, srgb_to_lab
+
+QUERIES = 100
+
+
+def brute_distances(index, color):
+    return np.sqrt(np.sum((index.lab - srgb_to_lab(color)) ** 2, axis=1))
+
+def queries(seed):
+    return np.random.default_rng(seed).random((QUERIES, 3))
+
+
+@pytest.fixture(scope="module", params=[1, 20, 5_000, 50_000])
+def index(request):
+    return PaletteIndex(np.random.default_rng(request.param).random((request.param, 3)))
+
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_nearest_matches_brute_force(index, k):
+    for q in queries(k):
+        d = brute_distances(index, q)
+        rows = index.nearest(q, k=k)
+        assert len(rows) == min(k, len(index))
+        # ties may come back in either order, so compare distances
+        np.testing.assert_allclose(d[rows], np.sort(d)[:len(rows)])
+        assert np.all(np.diff(d[rows]) >= 0)
+
+@pytest.mark.parametrize("radius", [2.0, 10.0, 40.0])
+def test_within_matches_brute_force(index, radius):
+    for q in queries(int(radius)):
+        d = brute_distances(index, q)
+        rows = index.within(q, radius)
+        assert set(rows.tolist()) == set(np.flatnonzero(d <= radius).tolist())
+        assert np.all(np.diff(d[rows]) >= 0)
+
+@pytest.mark.parametrize("hue,width", [(0, 15), (200, 15), (355, 20), (90, 180)])
+def test_near_hue_matches_brute_force(index, hue, width):
+    lab = index.lab
+    lch_hue = np.degrees(np.arctan2(lab[:, 2], lab[:, 1])) % 360
+    off = np.abs((lch_hue - hue + 180) % 360 - 180)
+    want = np.flatnonzero((off <= width) & (index.chroma >= 10))
+    assert set(index.near_hue(hue, width).tolist()) == set(want.tolist())
+
+def test_sample_is_seeded_and_spread(index):
+    a = index.sample(6, random.Random(3))
+    assert a.tolist() == index.sample(6, random.Random(3)).tolist()
+    assert len(set(a.tolist())) == len(a) == min(6, len(index))
+    if len(index) >= 20:  # farther apart than six random picks
+        lab = index.lab[a]
+        gaps = np.sqrt(((lab[:, None] - lab[None]) ** 2).sum(-1))[np.triu_indices(len(a), 1)]
+        picks = index.lab[np.random.default_rng(0).choice(len(index), 6, replace=False)]
+        random_gaps = np.sqrt(((picks[:, None] - picks[None]) ** 2).sum(-1))[np.triu_indices(6, 1)]
+        assert gaps.min() > random_gaps.min()
@@ -0,0 +1,96 @@
+"""PaletteStore: concurrent journal writers, torn lines and atomic compaction."""
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from palettes import PaletteStore
+
+WRITERS = 8
+OPS = 30  # adds per writer; every 3rd row is then updated and every 5th deleted
+COMPACT_BYTES = 1024  # small, so compactions happen while others write
+
+
+def expected_rows(writer):
+    rows = {}
+    for j in range(OPS):
+        if j % 5 == 0:
+            continue
+        rgb = (j / 100, writer / 10, 0.5)
+        rows[f"w{writer}_{j}"] = (0.9, writer / 10, 0.5) if j % 3 == 0 else rgb
+    return rows
+
+def write(path, writer):
+    store = PaletteStore(path, compact_bytes=COMPACT_BYTES)
+    for j in range(OPS):
+        store.add(f"w{writer}_{j}", j / 100, writer / 10, 0.5)
+    for j in range(0, OPS, 3):
+        store.update(f"w{writer}_{j}", r=0.9)
+    for j in range(0, OPS, 5):
+        store.delete(f"w{writer}_{j}")
+
+def read(path, stop, errors):
+    store = PaletteStore(path, compact_bytes=COMPACT_BYTES)
+    while not stop.is_set():
+        names = store.frame()["name"].tolist()  # one consistent view
+        if len(names) != len(set(names)):
+            errors.put(names)
+            return
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "palette.csv")
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_writers_lose_and_duplicate_nothing(path):
+    PaletteStore(path).names()  # write the default snapshot once
+    ctx = multiprocessing.get_context("fork")
+    stop, errors = ctx.Event(), ctx.Queue()
+    reader = ctx.Process(target=read, args=(path, stop, errors))
+    reader.start()
+    writers = [ctx.Process(target=write, args=(path, w)) for w in range(WRITERS)]
+    for p in writers:
+        p.start()
+    for p in writers:
+        p.join(120)
+        assert p.exitcode == 0
+    stop.set()
+    reader.join(30)
+    assert errors.empty(), "a reader saw duplicated rows"
+
+    store = PaletteStore(path)
+    names, colors = store.names(), store.colors()
+    defaults = ["sky", "sun", "forest", "cloud", "ocean"]
+    assert names[:5] == defaults
+    got = dict(zip(names[5:], map(tuple, colors[5:].tolist())))
+    want = {}
+    for w in range(WRITERS):
+        want.update(expected_rows(w))
+    assert len(names) == len(set(names)) == 5 + len(want)
+    assert got.keys() == want.keys()
+    for name, rgb in want.items():
+        np.testing.assert_allclose(got[name], rgb)
+
+    store.flush()  # everything folded into the CSV, nothing left to replay
+    assert os.path.getsize(store.journal_path) == 0
+    assert PaletteStore(path).names() == names
+
+def test_torn_line_is_skipped_and_sealed(path):
+    store = PaletteStore(path)
+    store.add("a", 0.1, 0.2, 0.3)
+    with open(store.journal_path, "ab") as f:
+        f.write(b'{"op": "add", "name": "torn"')  # a writer crashed mid-line
+    assert "torn" not in PaletteStore(path).names()
+    store.add("b", 0.4, 0.5, 0.6)
+    names = PaletteStore(path).names()
+    assert names[-2:] == ["a", "b"] and "torn" not in names
+
+def test_compaction_keeps_readers_consistent(path):
+    writer, reader = PaletteStore(path, compact_bytes=200), PaletteStore(path)
+    for i in range(20):
+        writer.add(f"c{i}", i / 20, 0, 0)
+        assert reader.names()[-1] == f"c{i}"
+    assert len(reader.names()) == 25
+    assert os.path.getsize(writer.journal_path) < 200  # compacted along the way
@@ -0,0 +1,84 @@
+"""LiveRaster: incremental PNGs match a full render, and adding a shape redraws nothing else."""
+import random
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import raster
+from figures import MemoryGuard, Overloaded
+from posters import Week4Canvas
+from render_cache import RenderCache
+
+DPI = 40
+
+
+def pixels(png):
+    """(height, width, 4) uint8 of an unfiltered RGBA PNG; zlib checks its adler32."""
+    pos, idat = 8, b""
+    while pos < len(png):
+        length, tag = struct.unpack(">I4s", png[pos:pos+8])
+        data = png[pos+8:pos+8+length]
+        if tag == b"IHDR":
+            width, height = struct.unpack(">II", data[:8])
+        elif tag == b"IDAT":
+            idat += data
+        pos += 12 + length
+    rows = np.frombuffer(zlib.decompress(idat), np.uint8).reshape(height, width*4 + 1)
+    assert not rows[:, 0].any()  # filter type 0 on every row
+    return rows[:, 1:].reshape(height, width, 4)
+
+def add(canvas, i):
+    rand = random.Random(i)
+    canvas.add((rand.random(), rand.random()), palette_index=i)
+
+
+def test_adler32_combine():
+    rand = random.Random(0)
+    for _ in range(50):
+        a, b = rand.randbytes(rand.randrange(5000)), rand.randbytes(rand.randrange(70000))
+        assert raster._adler32_combine(zlib.adler32(a), zlib.adler32(b), len(b)) == zlib.adler32(a + b)
+
+@pytest.mark.parametrize("kind", ["flowers", "spheres"])
+def test_adding_a_shape_leaves_other_rows_untouched(kind):
+    canvas = Week4Canvas(kind, seed=3)
+    live = raster.LiveRaster(canvas.scene, dpi=DPI)
+    before = pixels(live.png())
+    for i in range(12):
+        add(canvas, i)
+        live.update()
+        lo, hi = live.canvas.dirty
+        after = pixels(live.png())
+        changed = np.flatnonzero((after != before).any(axis=(1, 2)))
+        assert changed.size and lo <= changed.min() and changed.max() < hi
+        np.testing.assert_array_equal(after[:lo], before[:lo])
+        np.testing.assert_array_equal(after[hi:], before[hi:])
+        before = after
+    np.testing.assert_array_equal(after, pixels(raster.scene_png(canvas.scene, dpi=DPI)))
+
+def test_release_keeps_the_png_and_redraws_on_the_next_shape():
+    canvas = Week4Canvas("spheres", seed=1)
+    live = raster.LiveRaster(canvas.scene, dpi=DPI)
+    for i in range(3):
+        add(canvas, i)
+    png = live.png()
+    held = live.nbytes
+    live.release()
+    assert live.canvas is None and live.nbytes == len(png) < held
+    assert live.png() is png
+    add(canvas, 3)
+    np.testing.assert_array_equal(pixels(live.png()), pixels(raster.scene_png(canvas.scene, dpi=DPI)))
+
+def test_guard_counts_and_releases_held_rasters():
+    canvas = Week4Canvas("flowers", seed=2)
+    add(canvas, 0)
+    guard = MemoryGuard(budget=1, cache=RenderCache())  # always over budget
+    live = guard.hold(raster.LiveRaster(canvas.scene, dpi=DPI))
+    live.png()
+    assert guard.stats()["held"] == live.nbytes > live.canvas.buffer.nbytes
+    with pytest.raises(Overloaded):
+        guard.check()
+    assert live.canvas is None and guard.stats()["held"] == live.nbytes
+    del live
+    assert guard.stats()["held"] == 0
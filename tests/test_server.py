@@ -0,0 +1,190 @@
+"""Render API: request parsing, validation, backpressure, coalescing and batches."""
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+import server
+from render_cache import RENDER_CACHE
+
+
+class Writer:
+    """Collects what ``handle`` writes, like an ``asyncio.StreamWriter``."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def responses(data):
+    """[(status, headers, body)] of the HTTP responses in ``data``."""
+    out = []
+    while data:
+        head, _, rest = data.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        headers = dict(line.split(": ", 1) for line in lines[1:])
+        length = int(headers["Content-Length"])
+        out.append((int(lines[0].split()[1]), headers, rest[:length]))
+        data = rest[length:]
+    return out
+
+async def exchange(service, raw):
+    reader = asyncio.StreamReader()
+    reader.feed_data(raw)
+    reader.feed_eof()
+    writer = Writer()
+    await server.handle(service, reader, writer)
+    assert writer.closed
+    return responses(bytes(writer.data))
+
+def request(raw, workers=1, queue_size=4):
+    async def run():
+        service = server.RenderService(workers, queue_size)
+        try:
+            return await exchange(service, raw)
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+def get(target):
+    (status, _, body), = request(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    return status, json.loads(body) if body.startswith(b"{") else body
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setenv("POSTER_DISK_CACHE", "")  # workers start with no disk cache
+    RENDER_CACHE.clear()
+    yield
+    RENDER_CACHE.clear()
+
+
+# ---- HTTP ----
+@pytest.mark.parametrize("length", ["zz", "-5", "1.5"])
+def test_bad_content_length_is_400(length):
+    raw = f"POST /batch HTTP/1.1\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n".encode()
+    (status, _, body), = request(raw)
+    assert status == 400 and json.loads(body)["error"] == "bad Content-Length"
+
+def test_malformed_request_line_and_large_body():
+    (status, _, _), = request(b"NONSENSE\r\n\r\n")
+    assert status == 400
+    raw = f"POST /batch HTTP/1.1\r\nContent-Length: {server.MAX_BODY + 1}\r\n\r\n".encode()
+    (status, _, _), = request(raw)
+    assert status == 413
+
+def test_keep_alive_serves_several_requests():
+    raw = b"GET /health HTTP/1.1\r\n\r\nGET /nowhere HTTP/1.1\r\n\r\nGET /health HTTP/1.1\r\nConnection: close\r\n\r\n"
+    assert [status for status, _, _ in request(raw)] == [200, 404, 200]
+
+def test_unexpected_errors_are_500_without_details(monkeypatch):
+    async def broken(*args):
+        raise ValueError("'alpha' must be between 0 and 1")  # e.g. from matplotlib
+    monkeypatch.setattr(server, "route", broken)
+    status, body = get("/health")
+    assert status == 500 and body == {"error": "internal server error"}
+
+
+# ---- parameters ----
+@pytest.mark.parametrize("target", [
+    "/render/week5.png?seed=1&n_layers=100000000",
+    "/render/week5.png?seed=1&n_layers=3.5",
+    "/render/week2.png?seed=1&wobble_range=0.1,5",
+    "/render/week2.png?seed=1&wobble_range=0.1",
+    "/render/final.png?seed=1&shape=Cube",
+    "/render/week3.png?seed=1&preset=nope",
+    "/render/week4_spheres.png?seed=1&n_spheres=0",
+    "/render/week4_flowers.png?seed=1&wobble=nan",
+    "/render/week2.png?seed=1&dpi=100000",
+    "/render/week2.png?seed=x",
+    "/render/week2.png?seed=1&colour=red",
+    "/render/week2.gif?seed=1",
+    "/render/week2.png?seed=1&backend=cairo",
+])
+def test_bad_parameters_are_400(target):
+    status, body = get(target)
+    assert status == 400, body
+
+def test_unknown_page_is_404():
+    assert get("/render/week9.png?seed=1")[0] == 404
+
+def test_int_parameters_must_be_integers():
+    with pytest.raises(server.HTTPError):
+        server.parse_spec("week2", "png", {"seed": 1, "n_layers": 3.5})
+    key, job = server.parse_spec("week2", "png", {"seed": "1", "n_layers": "3"})
+    assert job[2] == {"n_layers": 3}
+
+def test_every_limit_renders():
+    # the ends of each range are valid posters, not errors from the builder
+    for page, limits in server.LIMITS.items():
+        for name, limit in limits.items():
+            for value in (limit if isinstance(limit[0], str) else limit):
+                if name == "wobble_range":
+                    value = (value, value)
+                _, (page_, seed, kwargs, *_) = server.parse_spec(page, "svg", {"seed": 0, name: value})
+                server.BUILDERS[page_](seed, **kwargs)
+
+def test_csv_palette_is_part_of_the_key():
+    key, job = server.parse_spec("week5", "png", {"seed": 1, "mode": "csv"})
+    other, _ = server.parse_spec("week5", "png", {"seed": 1, "mode": "pastel"})
+    assert key[3] is not None and other[3] is None
+    assert "csv_override" in job[2]
+
+
+# ---- queue ----
+def test_identical_requests_share_one_render_and_full_queue_is_busy():
+    async def run():
+        service = server.RenderService(workers=1, queue_size=1)  # not started: jobs stay queued
+        try:
+            key, job = server.parse_spec("week2", "png", {"seed": 1})
+            first, second = service.submit(key, job), service.submit(key, job)
+            assert first is second and service.coalesced == 1
+            other, job = server.parse_spec("week2", "png", {"seed": 2})
+            with pytest.raises(server.Busy) as busy:
+                service.submit(other, job)
+            assert busy.value.status == 503 and ("Retry-After", "1") in busy.value.headers
+            assert service.refused == 1 and service.stats()["queued"] == 1
+        finally:
+            await service.close()
+    asyncio.run(run())
+
+def test_batch_returns_zip_with_manifest():
+    items = [{"page": "week2", "seed": 1, "dpi": 20, "backend": "numpy"},
+             {"page": "week2", "seed": 1, "dpi": 20, "backend": "numpy"},  # coalesced with the first
+             {"page": "week3", "seed": 2, "format": "svg"}]
+    body = json.dumps({"items": items}).encode()
+    raw = b"POST /batch HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+
+    async def run():
+        service = server.RenderService(workers=1, queue_size=4)
+        service.start()
+        try:
+            return await exchange(service, raw), service.stats()
+        finally:
+            await service.close()
+    [(status, headers, data)], stats = asyncio.run(run())
+    assert status == 200 and headers["Content-Type"] == "application/zip"
+    assert stats["rendered"] == 2 and stats["coalesced"] == 1
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [e["file"] for e in manifest] == ["000_week2_seed1.png", "001_week2_seed1.png", "002_week3_seed2.svg"]
+    assert archive.read("000_week2_seed1.png") == archive.read("001_week2_seed1.png")
+    assert archive.read("000_week2_seed1.png").startswith(b"\x89PNG")
+    assert b"<svg" in archive.read("002_week3_seed2.svg")[:200]
+
+def test_batch_over_queue_room_is_refused_whole():
+    items = [{"page": "week2", "seed": s} for s in range(3)]
+    body = json.dumps(items).encode()
+    raw = b"POST /batch HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+    (status, headers, _), = request(raw, queue_size=2)
+    assert status == 503 and headers["Retry-After"] == "1"
@@ -0,0 +1,145 @@
+"""Tiled large-format rendering: print-size posters with bounded memory.
+
+An A0 poster at 600 dpi is about 19,900 x 28,000 pixels, far more than one
+Agg canvas (or one NumPy buffer) should hold.  Here the full figure is cut
+into horizontal strips of ``STRIP_ROWS`` pixel rows.  Every strip is drawn
+on its own small canvas, the strips render in parallel worker processes,
+and finished strips are streamed in order into a PNG file.  Peak memory is
+about ``(workers + 1)`` strips, whatever the output size.
+
+With the matplotlib backend each strip is a figure one (padded) strip tall
+whose axes are placed where they sit on the full figure, partly outside the
+strip.  The strips join into the image a single full-size ``savefig`` would
+give, text and titles included; at most a few anti-aliased pixels of thick
+strokes differ, where Agg simplifies a long line differently.  The NumPy backend
+(``raster.py``) is drawn the same way but skips text, as it does elsewhere.
+
+    python tiles.py --style Minimal --seed 42 --paper A0 --dpi 600 poster_a0.png
+"""
+import argparse
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+
+import raster
+from figures import FIGURES
+from scene import Stroke, draw_on
+
+STRIP_ROWS = 512
+PAPER_INCHES = {"A0": (33.11, 46.81), "A1": (23.39, 33.11), "A2": (16.54, 23.39), "A3": (11.69, 16.54), "A4": (8.27, 11.69)}
+
+
+def output_size(scene, dpi):
+    """Pixel size of the full figure, as Agg sizes it."""
+    return int(scene.figsize[0] * dpi), int(scene.figsize[1] * dpi)
+
+def fit_dpi(scene, paper, dpi):
+    """Render dpi that prints ``scene`` across the width of ``paper`` at ``dpi``."""
+    return dpi * PAPER_INCHES[paper][0] / scene.figsize[0]
+
+
+# ==================== Strips ====================
+def _inches(pixels, dpi):
+    # smallest size in inches that Agg turns back into exactly ``pixels``
+    inches = pixels / dpi
+    while int(inches * dpi) < pixels:
+        inches = math.nextafter(inches, math.inf)
+    return inches
+
+def overlap_rows(scene, dpi):
+    """Extra rows drawn above and below a strip and then cut off.
+
+    Agg clips line paths to the canvas, which changes how a thick stroke is
+    joined right at the cut; with this much margin the cut happens where
+    nothing of the stroke reaches the rows that are kept.
+    """
+    import matplotlib
+    widest = max([s.linewidth for s in scene.shapes if isinstance(s, Stroke)] + [matplotlib.rcParams["patch.linewidth"]])
+    return int(math.ceil(2 * widest * dpi / 72)) + 4
+
+def render_strip(scene, dpi, row0, rows, backend="matplotlib"):
+    """Rows ``row0 .. row0+rows`` of the full poster as (rows, width, 4) uint8."""
+    fig_w, fig_h = scene.figsize[0] * dpi, scene.figsize[1] * dpi  # display units (float)
+    width, height = output_size(scene, dpi)
+    left, bottom, right, top = raster.AXES_BOX
+    if backend == "numpy":
+        canvas = raster.Canvas(width, rows)
+        box = (left*fig_w, (height - top*fig_h) - row0, (right-left)*fig_w, (top-bottom)*fig_h)
+        return raster.draw(scene, canvas, dpi, box=box).to_uint8()
+
+    pad = overlap_rows(scene, dpi)
+    # strips of one poster share a size, so the figure (and its Agg buffer) is reused
+    with FIGURES.subplots((scene.figsize[0], _inches(rows + 2*pad, dpi))) as (fig, ax):
+        fig.set_dpi(dpi)
+        strip_h = fig.bbox.height
+        # Agg flips y against the integer canvas height; shift the axes so the
+        # padded strip's rows land on the strip canvas.
+        shift = height - (row0 - pad) - (rows + 2*pad)
+        ax.set_position([left, (bottom*fig_h - shift) / strip_h, right-left, (top-bottom)*fig_h / strip_h])
+        draw_on(ax, scene)
+        fig.canvas.draw()
+        return np.asarray(fig.canvas.buffer_rgba())[pad:pad+rows, :width].copy()
+
+
+# ==================== Driver ====================
+def render_tiled(scene, path, dpi, backend="matplotlib", strip_rows=STRIP_ROWS, workers=None, phys_dpi=None):
+    """Render ``scene`` at ``dpi`` into the PNG file ``path``, one strip at a time.
+
+    ``workers`` processes render strips in parallel (``1``: in this process).
+    ``phys_dpi`` is recorded in the PNG as the print resolution (default ``dpi``).
+    Returns the image size in pixels.
+    """
+    width, height = output_size(scene, dpi)
+    starts = range(0, height, strip_rows)
+    with open(path, "wb") as f:
+        writer = raster.PNGWriter(f, width, height, phys_dpi or dpi)
+        if workers == 1:
+            for row0 in starts:
+                writer.write(render_strip(scene, dpi, row0, min(strip_rows, height - row0), backend))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(workers) as pool:
+                # keep only a few strips in flight so memory stays bounded
+                window = workers + 1
+                pending = deque()
+                for row0 in starts:
+                    pending.append(pool.submit(render_strip, scene, dpi, row0, min(strip_rows, height - row0), backend))
+                    if len(pending) >= window:
+                        writer.write(pending.popleft().result())
+                while pending:
+                    writer.write(pending.popleft().result())
+        writer.close()
+    return width, height
+
+
+def main(argv=None):
+    from posters import BUILDERS, TASK6_PRESETS, task6_scene
+
+    parser = argparse.ArgumentParser(description="Render one poster at print size, strip by strip.")
+    parser.add_argument("output")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--style", choices=list(TASK6_PRESETS), help="Week 3 Task 6 style (default: Pastel)")
+    source.add_argument("--page", choices=list(BUILDERS), help="app page builder with its default settings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dpi", type=int, default=600, help="print resolution")
+    parser.add_argument("--paper", choices=list(PAPER_INCHES), help="scale the poster to this paper width")
+    parser.add_argument("--backend", choices=["matplotlib", "numpy"], default="matplotlib")
+    parser.add_argument("--strip-rows", type=int, default=STRIP_ROWS)
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    scene = BUILDERS[args.page](args.seed) if args.page else task6_scene(args.style or "Pastel", args.seed)
+    dpi = fit_dpi(scene, args.paper, args.dpi) if args.paper else args.dpi
+    t = time.perf_counter()
+    width, height = render_tiled(scene, args.output, dpi, args.backend, args.strip_rows, args.workers, args.dpi)
+    print(f"Saved {width}x{height} poster as {args.output} in {time.perf_counter() - t:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Per-stage timings of the render path.
+
+Each script rerun opens a :class:`Trace` with ``TIMINGS.begin(page)``.  Hot
+paths mark their stages with ``with stage("draw"):`` blocks or the
+:func:`timed` decorator.  Nested stages are named by path (``scene/geometry``)
+and every stage is charged its own time only, so a rerun's breakdown adds up
+to the instrumented total.  Outside a trace (batch scripts, worker
+processes, the benchmarks) a stage costs one context-variable lookup.
+
+:data:`TIMINGS` keeps rolling per-page samples for percentiles and the last
+few traces for export in Chrome's trace-event JSON format (chrome://tracing,
+https://ui.perfetto.dev).  Set ``POSTER_TIMINGS=0`` to switch recording off.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+ENABLED = os.environ.get("POSTER_TIMINGS", "1") != "0"
+WINDOW = 200  # reruns per page kept for percentiles
+RECENT = 20  # reruns kept for the JSON trace
+
+_current = contextvars.ContextVar("poster_trace", default=None)
+
+
+class Trace:
+    """The stages of one rerun, as (path, start, duration, own time) in seconds."""
+
+    def __init__(self, page=None):
+        self.page = page
+        self.started = time.time()
+        self.thread = threading.get_ident()
+        self.events = []
+        self.total = None
+        self._t0 = time.perf_counter()
+        self._stack = []  # [path, start, time spent in child stages]
+
+    def push(self, name):
+        path = f"{self._stack[-1][0]}/{name}" if self._stack else name
+        self._stack.append([path, time.perf_counter(), 0.0])
+
+    def pop(self):
+        path, start, children = self._stack.pop()
+        duration = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += duration
+        self.events.append((path, start - self._t0, duration, duration - children))
+
+    def breakdown(self):
+        """{stage path: own seconds}, in the order the stages started."""
+        out = {}
+        for path, _, _, own in sorted(self.events, key=lambda e: e[1]):
+            out[path] = out.get(path, 0.0) + own
+        return out
+
+
+@contextmanager
+def stage(name):
+    """Charge the time of the ``with`` block to ``name`` in the current trace."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    trace.push(name)
+    try:
+        yield
+    finally:
+        trace.pop()
+
+def timed(name):
+    """Decorator form of :func:`stage`."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+class Timings:
+    """Rolling stage timings per page, and the most recent traces."""
+
+    def __init__(self, window=WINDOW, recent=RECENT):
+        self.window = window
+        self.recent = deque(maxlen=recent)
+        self._samples = {}  # (page, stage path) -> deque of seconds
+        self._lock = threading.Lock()
+
+    def begin(self, page=None):
+        """Start tracing this rerun (in this thread); ``None`` when recording is off."""
+        if not ENABLED:
+            return None
+        trace = Trace(page)
+        _current.set(trace)
+        return trace
+
+    def end(self):
+        """Finish the current trace and add it to the rolling samples."""
+        trace = _current.get()
+        if trace is None:
+            return None
+        _current.set(None)
+        trace.total = time.perf_counter() - trace._t0
+        with self._lock:
+            for path, seconds in [("total", trace.total), *trace.breakdown().items()]:
+                samples = self._samples.get((trace.page, path))
+                if samples is None:
+                    samples = self._samples[(trace.page, path)] = deque(maxlen=self.window)
+                samples.append(seconds)
+            self.recent.append(trace)
+        return trace
+
+    def percentiles(self, page, q=(50, 90, 99)):
+        """{stage path: (samples, *percentiles)} in seconds for ``page``.
+
+        A stage only has samples from the reruns it ran in (a cache hit skips
+        the render stages), so compare counts as well as times.
+        """
+        with self._lock:
+            series = [(path, list(s)) for (p, path), s in self._samples.items() if p == page]
+        return {path: (len(v), *np.percentile(v, q)) for path, v in series}
+
+    def chrome_trace(self):
+        """The recent traces as Chrome trace-event JSON."""
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            traces = list(self.recent)
+        for trace in traces:
+            t0 = trace.started * 1e6
+            events.append({"name": trace.page or "rerun", "cat": "rerun", "ph": "X", "pid": pid, "tid": trace.thread,
+                           "ts": t0, "dur": trace.total * 1e6})
+            for path, start, duration, own in trace.events:
+                events.append({"name": path.rsplit("/", 1)[-1], "cat": "stage", "ph": "X", "pid": pid, "tid": trace.thread,
+                               "ts": t0 + start * 1e6, "dur": duration * 1e6,
+                               "args": {"path": path, "own_ms": round(own * 1000, 3)}})
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self.recent.clear()
+
+
+TIMINGS = Timings()